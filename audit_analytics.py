@@ -0,0 +1,322 @@
+import os
+import json
+import argparse
+
+from audit_store import AuditStore
+
+# --- CONFIGURATION ---
+AUDIT_DIR = "audit runs"
+UNCLASSIFIED = "UNKNOWN"  # Room class bucket for rows stored before the class was recorded
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_runs (
+    run_id INTEGER PRIMARY KEY,
+    job_reference TEXT,
+    run_date TEXT,
+    rooms INTEGER,
+    rooms_failed INTEGER,
+    rooms_suboptimal INTEGER,
+    ach_mean REAL,
+    equipment INTEGER,
+    equipment_failed INTEGER
+);
+CREATE TABLE IF NOT EXISTS rollup_jobs (
+    job_reference TEXT PRIMARY KEY,
+    runs INTEGER,
+    first_run_id INTEGER,
+    last_run_id INTEGER,
+    last_run_date TEXT,
+    rooms INTEGER,
+    rooms_failed INTEGER,
+    equipment INTEGER,
+    equipment_failed INTEGER
+);
+CREATE TABLE IF NOT EXISTS rollup_room_classes (
+    job_reference TEXT,
+    room_class TEXT,
+    runs INTEGER,
+    rooms INTEGER,
+    rooms_failed INTEGER,
+    rooms_suboptimal INTEGER,
+    ach_sum REAL,
+    ach_min REAL,
+    ach_max REAL,
+    PRIMARY KEY (job_reference, room_class)
+);
+CREATE TABLE IF NOT EXISTS rollup_categories (
+    job_reference TEXT,
+    category TEXT,
+    runs INTEGER,
+    equipment INTEGER,
+    equipment_failed INTEGER,
+    PRIMARY KEY (job_reference, category)
+);
+CREATE TABLE IF NOT EXISTS rollup_issues (
+    job_reference TEXT,
+    issue TEXT,
+    occurrences INTEGER,
+    runs INTEGER,
+    first_run_id INTEGER,
+    last_run_id INTEGER,
+    PRIMARY KEY (job_reference, issue)
+);
+CREATE TABLE IF NOT EXISTS rollup_marks (
+    job_reference TEXT,
+    mark TEXT,
+    category TEXT,
+    runs INTEGER,
+    failed_runs INTEGER,
+    last_run_id INTEGER,
+    last_status TEXT,
+    last_issues TEXT,
+    PRIMARY KEY (job_reference, mark)
+);
+CREATE TABLE IF NOT EXISTS rollup_rooms (
+    job_reference TEXT,
+    name TEXT,
+    room_class TEXT,
+    runs INTEGER,
+    failed_runs INTEGER,
+    ach_sum REAL,
+    ach_min REAL,
+    ach_max REAL,
+    last_run_id INTEGER,
+    last_ach REAL,
+    last_status TEXT,
+    PRIMARY KEY (job_reference, name)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_runs_job ON rollup_runs (job_reference, run_id);
+CREATE INDEX IF NOT EXISTS idx_rollup_marks_failed ON rollup_marks (failed_runs DESC);
+CREATE INDEX IF NOT EXISTS idx_rollup_issues_count ON rollup_issues (occurrences DESC);
+"""
+
+class AuditAnalytics(object):
+    """Cross-run rollups over an AuditStore, maintained incrementally.
+
+    apply_run() folds one finished run into per-job, per-room-class,
+    per-category, per-issue, per-mark and per-room rollups inside a single
+    transaction, reading only that run's result rows, and is a no-op for a
+    run already applied. Dashboard queries then read the rollup tables, so
+    their cost depends on the number of jobs/classes/marks returned, not
+    on the size of the audit history.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.conn
+        self.conn.executescript(SCHEMA)
+
+    def pending_runs(self):
+        """Complete runs not yet rolled up; a plain read, so it never waits on running audits"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT run_id FROM runs WHERE status = 'complete'"
+            " AND run_id NOT IN (SELECT run_id FROM rollup_runs) ORDER BY run_id"
+        )]
+
+    def catch_up(self):
+        """Applies every complete run not yet rolled up (runs seeded from old JSON files, batch runs); returns the count"""
+        pending = self.pending_runs()
+        for run_id in pending:
+            self.apply_run(run_id)
+        return len(pending)
+
+    def apply_run(self, run_id):
+        self.store._transaction(self._apply_run, run_id)
+
+    def _apply_run(self, run_id):
+        if self.conn.execute("SELECT 1 FROM rollup_runs WHERE run_id = ?", (run_id,)).fetchone():
+            return
+        run = self.conn.execute("SELECT job_reference, run_date FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if run is None:
+            return
+        job, run_date = run
+        rooms, rooms_failed, rooms_suboptimal, ach_mean = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'FAIL'), 0), COALESCE(SUM(comfort != 'Optimal'), 0), AVG(ach)"
+            " FROM room_results WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        equipment, equipment_failed = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'FAIL'), 0) FROM equipment_results WHERE run_id = ?", (run_id,)
+        ).fetchone()
+
+        self.conn.execute("INSERT INTO rollup_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (run_id, job, run_date, rooms, rooms_failed, rooms_suboptimal, ach_mean,
+                           equipment, equipment_failed))
+        self.conn.execute(
+            "INSERT INTO rollup_jobs VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (job_reference) DO UPDATE SET runs = runs + 1,"
+            " first_run_id = MIN(first_run_id, excluded.first_run_id),"
+            " last_run_date = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.last_run_date ELSE last_run_date END,"
+            " last_run_id = MAX(last_run_id, excluded.last_run_id),"
+            " rooms = rooms + excluded.rooms, rooms_failed = rooms_failed + excluded.rooms_failed,"
+            " equipment = equipment + excluded.equipment, equipment_failed = equipment_failed + excluded.equipment_failed",
+            (job, run_id, run_id, run_date, rooms, rooms_failed, equipment, equipment_failed)
+        )
+
+        # Grouped over this run's rows only (indexed by run_id)
+        self.conn.execute(
+            "INSERT INTO rollup_room_classes"
+            " SELECT ?, COALESCE(room_class, ?), 1, COUNT(*), SUM(status = 'FAIL'), SUM(comfort != 'Optimal'),"
+            " SUM(ach), MIN(ach), MAX(ach) FROM room_results WHERE run_id = ? GROUP BY COALESCE(room_class, ?) "
+            " ON CONFLICT (job_reference, room_class) DO UPDATE SET runs = runs + 1,"
+            " rooms = rooms + excluded.rooms, rooms_failed = rooms_failed + excluded.rooms_failed,"
+            " rooms_suboptimal = rooms_suboptimal + excluded.rooms_suboptimal, ach_sum = ach_sum + excluded.ach_sum,"
+            " ach_min = MIN(ach_min, excluded.ach_min), ach_max = MAX(ach_max, excluded.ach_max)",
+            (job, UNCLASSIFIED, run_id, UNCLASSIFIED)
+        )
+        self.conn.execute(
+            "INSERT INTO rollup_categories"
+            " SELECT ?, category, 1, COUNT(*), SUM(status = 'FAIL') FROM equipment_results WHERE run_id = ?"
+            " GROUP BY category"
+            " ON CONFLICT (job_reference, category) DO UPDATE SET runs = runs + 1,"
+            " equipment = equipment + excluded.equipment, equipment_failed = equipment_failed + excluded.equipment_failed",
+            (job, run_id)
+        )
+        # A mark/room listed twice in one schedule counts once per run; its last row wins
+        self.conn.execute(
+            "INSERT INTO rollup_marks"
+            " SELECT ?, mark, category, 1, MAX(status = 'FAIL'), ?, status, issues FROM"
+            " (SELECT * FROM equipment_results WHERE run_id = ? ORDER BY rowid) GROUP BY mark"
+            " ON CONFLICT (job_reference, mark) DO UPDATE SET runs = runs + 1,"
+            " failed_runs = failed_runs + excluded.failed_runs,"
+            " category = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.category ELSE category END,"
+            " last_status = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.last_status ELSE last_status END,"
+            " last_issues = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.last_issues ELSE last_issues END,"
+            " last_run_id = MAX(last_run_id, excluded.last_run_id)",
+            (job, run_id, run_id)
+        )
+        self.conn.execute(
+            "INSERT INTO rollup_rooms"
+            " SELECT ?, name, COALESCE(room_class, ?), 1, MAX(status = 'FAIL'), ach, ach, ach, ?, ach, status FROM"
+            " (SELECT * FROM room_results WHERE run_id = ? ORDER BY rowid) GROUP BY name"
+            " ON CONFLICT (job_reference, name) DO UPDATE SET runs = runs + 1,"
+            " failed_runs = failed_runs + excluded.failed_runs, ach_sum = ach_sum + excluded.ach_sum,"
+            " ach_min = MIN(ach_min, excluded.ach_min), ach_max = MAX(ach_max, excluded.ach_max),"
+            " room_class = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.room_class ELSE room_class END,"
+            " last_ach = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.last_ach ELSE last_ach END,"
+            " last_status = CASE WHEN excluded.last_run_id > last_run_id THEN excluded.last_status ELSE last_status END,"
+            " last_run_id = MAX(last_run_id, excluded.last_run_id)",
+            (job, UNCLASSIFIED, run_id, run_id)
+        )
+
+        # Issues are the rule messages validate_equipment joins with ", "
+        counts = {}
+        for (issues,) in self.conn.execute(
+                "SELECT issues FROM equipment_results WHERE run_id = ? AND status = 'FAIL'", (run_id,)):
+            for issue in issues.split(", "):
+                counts[issue] = counts.get(issue, 0) + 1
+        self.conn.executemany(
+            "INSERT INTO rollup_issues VALUES (?, ?, ?, 1, ?, ?)"
+            " ON CONFLICT (job_reference, issue) DO UPDATE SET occurrences = occurrences + excluded.occurrences,"
+            " runs = runs + 1, first_run_id = MIN(first_run_id, excluded.first_run_id),"
+            " last_run_id = MAX(last_run_id, excluded.last_run_id)",
+            [(job, issue, count, run_id, run_id) for issue, count in counts.items()]
+        )
+
+    # --- Dashboard queries (rollup tables only) ---
+
+    def _query(self, sql, params=()):
+        return self.store._query(sql, params)
+
+    def jobs(self):
+        return self._query("SELECT * FROM rollup_jobs ORDER BY last_run_id DESC")
+
+    def run_trend(self, job_reference, limit=50):
+        """Per-run totals and mean ACH for a job, oldest first"""
+        rows = self._query("SELECT * FROM rollup_runs WHERE job_reference = ? ORDER BY run_id DESC LIMIT ?",
+                           (job_reference, limit))
+        return rows[::-1]
+
+    def _by_job(self, table, key, columns, job_reference):
+        if job_reference:
+            return self._query(f"SELECT {key}, {columns} FROM {table} WHERE job_reference = ? ORDER BY {key}",
+                               (job_reference,))
+        # Across jobs: one row per job and key, summed
+        summed = ", ".join(f"SUM({c}) AS {c}" for c in columns.split(", "))
+        return self._query(f"SELECT {key}, {summed} FROM {table} GROUP BY {key} ORDER BY {key}")
+
+    def room_classes(self, job_reference=None):
+        rows = self._by_job("rollup_room_classes", "room_class",
+                            "runs, rooms, rooms_failed, rooms_suboptimal, ach_sum", job_reference)
+        for row in rows:
+            row["ach_mean"] = round(row.pop("ach_sum") / row["rooms"], 2) if row["rooms"] else None
+        return rows
+
+    def categories(self, job_reference=None):
+        return self._by_job("rollup_categories", "category", "runs, equipment, equipment_failed", job_reference)
+
+    def issues(self, job_reference=None, limit=20):
+        if job_reference:
+            return self._query("SELECT issue, occurrences, runs, first_run_id, last_run_id FROM rollup_issues"
+                               " WHERE job_reference = ? ORDER BY occurrences DESC LIMIT ?", (job_reference, limit))
+        return self._query("SELECT issue, SUM(occurrences) AS occurrences, SUM(runs) AS runs FROM rollup_issues"
+                           " GROUP BY issue ORDER BY occurrences DESC LIMIT ?", (limit,))
+
+    def recurring_failures(self, job_reference=None, min_failed_runs=2, limit=20):
+        """Equipment marks that failed in at least min_failed_runs runs, most frequent first"""
+        sql = "SELECT * FROM rollup_marks WHERE failed_runs >= ?"
+        params = [min_failed_runs]
+        if job_reference:
+            sql += " AND job_reference = ?"
+            params.append(job_reference)
+        return self._query(sql + " ORDER BY failed_runs DESC, mark LIMIT ?", params + [limit])
+
+    def room(self, job_reference, name):
+        """Rollup for one room (runs, failures, ACH min/mean/max, latest ACH/status), or None"""
+        rows = self._query("SELECT * FROM rollup_rooms WHERE job_reference = ? AND name = ?", (job_reference, name))
+        if not rows:
+            return None
+        row = rows[0]
+        row["ach_mean"] = round(row.pop("ach_sum") / row["runs"], 2) if row["runs"] else None
+        return row
+
+    def room_ach_trend(self, job_reference, name, limit=50):
+        """ACH of one room per run, oldest first (an indexed lookup on room name, not a history scan)"""
+        rows = self._query(
+            "SELECT r.run_id, r.run_date, rr.ach, rr.status FROM room_results rr JOIN runs r USING (run_id)"
+            " WHERE rr.name = ? AND r.job_reference = ? AND r.status = 'complete' ORDER BY rr.run_id DESC LIMIT ?",
+            (name, job_reference, limit)
+        )
+        return rows[::-1]
+
+VIEWS = {
+    "jobs": lambda a, args: a.jobs(),
+    "run_trend": lambda a, args: a.run_trend(args["job"], args.get("limit", 50)),
+    "room_classes": lambda a, args: a.room_classes(args.get("job")),
+    "categories": lambda a, args: a.categories(args.get("job")),
+    "issues": lambda a, args: a.issues(args.get("job"), args.get("limit", 20)),
+    "recurring_failures": lambda a, args: a.recurring_failures(args.get("job"), args.get("min_failed_runs", 2),
+                                                               args.get("limit", 20)),
+    "room": lambda a, args: a.room(args["job"], args["room"]),
+    "room_ach_trend": lambda a, args: a.room_ach_trend(args["job"], args["room"], args.get("limit", 50)),
+}
+
+def answer_view(analytics, view, args):
+    """Answers a dashboard view (see VIEWS) from the rollup tables as they stand; read-only"""
+    if view not in VIEWS:
+        raise ValueError(f"Unknown analytics view: {view}")
+    return VIEWS[view](analytics, args)
+
+def query_view(store, view, args):
+    """Answers a dashboard view (see VIEWS) after rolling up any runs not yet applied"""
+    if view not in VIEWS:
+        raise ValueError(f"Unknown analytics view: {view}")
+    analytics = AuditAnalytics(store)
+    analytics.catch_up()
+    return answer_view(analytics, view, args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-run audit analytics from the rollup tables")
+    parser.add_argument("view", choices=sorted(VIEWS))
+    parser.add_argument("--job", help="Job reference (required for run_trend, room, room_ach_trend)")
+    parser.add_argument("--room", help="Room name (room, room_ach_trend)")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--audit-dir", default=AUDIT_DIR)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.audit_dir):
+        parser.error(f"Audit directory not found: {args.audit_dir}")
+    store = AuditStore(args.audit_dir)
+    try:
+        view_args = {key: value for key, value in vars(args).items() if value is not None}
+        print(json.dumps(query_view(store, args.view, view_args), indent=4))
+    finally:
+        store.close()
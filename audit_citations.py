@@ -0,0 +1,66 @@
+# --- CONFIGURATION ---
+CITATIONS_PER_FAILURE = 3  # Distinct (manual, page) citations kept per failure type
+EXCERPT_CHARS = 240        # Leading text of each cited chunk kept in the report
+
+class FailureTypes(object):
+    """Distinct failure types found in one audit run, with how many findings each covers.
+
+    Rooms fail per standard (room class); equipment fails per (category,
+    rule issue). Each type carries the regulation query used to cite it,
+    so citation cost scales with distinct types rather than FAIL rows.
+    """
+    def __init__(self):
+        self.types = {}
+
+    def _add(self, kind, subject, issue, query):
+        key = (kind, subject, issue)
+        if key not in self.types:
+            self.types[key] = {"kind": kind, "subject": subject, "issue": issue, "query": query, "findings": 0}
+        self.types[key]["findings"] += 1
+
+    def add_room(self, row):
+        room_class = row.get("class") or "Unknown class"
+        self._add("room", room_class, "Below minimum ACH",
+                  f"{room_class.replace('_', ' ')} minimum air changes per hour (ACH) requirement")
+
+    def add_equipment(self, row):
+        # Rule messages are joined with ", " by validate_equipment
+        for issue in row["issues"].split(", "):
+            self._add("equipment", row["category"], issue, f"{row['category']} {issue}")
+
+    def __len__(self):
+        return len(self.types)
+
+def cite_failures(failures):
+    """Citations block for the audit JSON from one batched search over every failure type.
+
+    Returns {"failure_types": [...], "sources": [...]}: each failure type
+    lists up to CITATIONS_PER_FAILURE {source, page} citations, and every
+    cited (source, page) appears once in "sources" with an excerpt. If the
+    manuals index cannot be searched, failure types are returned uncited
+    with an "error".
+    """
+    # Imported on first use so audits without citations never load the RAG stack
+    import query_manuals
+
+    failure_types = [dict(failure, citations=[]) for failure in failures.types.values()]
+    if not failure_types:
+        return {"failure_types": [], "sources": []}
+    answer = query_manuals.query_batch([failure["query"] for failure in failure_types])
+    if "error" in answer:
+        return {"failure_types": failure_types, "sources": [], "error": answer["error"]}
+
+    sources = {}
+    for failure in failure_types:
+        for item in answer["results"].get(failure["query"], []):
+            key = (item["source"], item["page"])
+            if key in [(c["source"], c["page"]) for c in failure["citations"]]:
+                continue
+            if key not in sources:
+                sources[key] = {"source": item["source"], "page": item["page"],
+                                "excerpt": " ".join(item["content"].split())[:EXCERPT_CHARS], "cited_by": 0}
+            sources[key]["cited_by"] += 1
+            failure["citations"].append({"source": item["source"], "page": item["page"]})
+            if len(failure["citations"]) == CITATIONS_PER_FAILURE:
+                break
+    return {"failure_types": failure_types, "sources": list(sources.values())}
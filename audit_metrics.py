@@ -0,0 +1,111 @@
+import os
+import time
+import contextlib
+
+class AuditMetrics(object):
+    """Per-stage wall-clock timers and counters for one audit run.
+
+    Stages nest: time spent in an inner stage (e.g. "comfort" inside
+    "validate_rooms") is charged to the inner stage only, so the stage
+    seconds never double count. Timing is per chunk, not per row,
+    to keep the overhead negligible. `startup_seconds` (interpreter start
+    to the audit, see process_startup_seconds) is reported only when given:
+    it means nothing for audits run inside a long-lived worker.
+    """
+    def __init__(self, startup_seconds=None):
+        self.started = time.perf_counter()
+        self.startup_seconds = startup_seconds
+        self.seconds = {}
+        self.rows = {}
+        self.failures = {}
+        self.bytes_written = {}
+        self._stack = []
+        self._mark = self.started
+
+    def _switch(self):
+        now = time.perf_counter()
+        if self._stack:
+            name = self._stack[-1]
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+            if rows:
+                self.add_rows(name, rows)
+
+    def timed_iter(self, name, iterable):
+        """Yields from iterable, charging the time spent producing each item to `name`"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def add_rows(self, name, rows):
+        self.rows[name] = self.rows.get(name, 0) + rows
+
+    def failure(self, rule, amount=1):
+        self.failures[rule] = self.failures.get(rule, 0) + amount
+
+    def to_dict(self):
+        total = time.perf_counter() - self.started
+        stages = {}
+        for name, seconds in self.seconds.items():
+            entry = {"seconds": round(seconds, 6)}
+            if name in self.rows:
+                entry["rows"] = self.rows[name]
+                entry["rows_per_sec"] = round(self.rows[name] / seconds, 1) if seconds else None
+            stages[name] = entry
+        report = {"total_seconds": round(total, 6)}
+        if self.startup_seconds is not None:
+            report["startup_seconds"] = self.startup_seconds
+        report.update({
+            "stages": stages,
+            "failures_by_rule": dict(sorted(self.failures.items(), key=lambda item: -item[1])),
+            "bytes_written": dict(self.bytes_written)
+        })
+        return report
+
+def metrics_stage(metrics, name, rows=0):
+    """metrics.stage(...) that is a no-op when metrics is None"""
+    return metrics.stage(name, rows) if metrics is not None else contextlib.nullcontext()
+
+def process_startup_seconds(until=None):
+    """Seconds from process start to the perf_counter value `until`, default now (Linux /proc only, else None)"""
+    until = time.perf_counter() if until is None else until
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Field 22 (starttime) in clock ticks since boot; split after the ')' of the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    age = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    # Process age now, minus the time elapsed since `until`
+    return round(max(0.0, age - (time.perf_counter() - until)), 3)
+
+def profiled(profile_path, fn, *args, **kwargs):
+    """Runs fn under cProfile and dumps the stats to profile_path.
+
+    The .prof file loads in pstats/snakeviz, and flameprof or
+    gprof2dot turn it into a flamegraph.
+    """
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
@@ -0,0 +1,260 @@
+import os
+import re
+import glob
+import json
+import sqlite3
+from datetime import datetime
+
+# --- CONFIGURATION ---
+STORE_FILE = "audits.sqlite3"  # Lives inside the 'audit runs' directory
+AUDIT_FILE_RE = re.compile(r"audit_(\d+)\.(?:json|txt)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    job_reference TEXT,
+    run_date TEXT,
+    input_file TEXT,
+    status TEXT,
+    txt_path TEXT,
+    json_path TEXT
+);
+CREATE TABLE IF NOT EXISTS room_results (
+    run_id INTEGER REFERENCES runs (run_id),
+    name TEXT,
+    ach REAL,
+    status TEXT,
+    comfort TEXT,
+    pmv REAL,
+    ppd REAL,
+    room_class TEXT
+);
+CREATE TABLE IF NOT EXISTS equipment_results (
+    run_id INTEGER REFERENCES runs (run_id),
+    mark TEXT,
+    category TEXT,
+    status TEXT,
+    issues TEXT
+);
+CREATE TABLE IF NOT EXISTS row_cache (
+    job_reference TEXT,
+    input_file TEXT,
+    kind TEXT,
+    row_key TEXT,
+    row_hash TEXT,
+    result TEXT,
+    last_seen INTEGER,
+    PRIMARY KEY (job_reference, input_file, kind, row_key)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_job ON runs (job_reference, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_date ON runs (run_date);
+CREATE INDEX IF NOT EXISTS idx_rooms_run ON room_results (run_id);
+CREATE INDEX IF NOT EXISTS idx_rooms_name ON room_results (name, run_id);
+CREATE INDEX IF NOT EXISTS idx_rooms_status ON room_results (status, run_id);
+CREATE INDEX IF NOT EXISTS idx_equipment_run ON equipment_results (run_id);
+CREATE INDEX IF NOT EXISTS idx_equipment_mark ON equipment_results (mark, run_id);
+CREATE INDEX IF NOT EXISTS idx_equipment_status ON equipment_results (status, run_id);
+"""
+
+class AuditStore(object):
+    """SQLite index of audit runs and their per-room / per-equipment results.
+
+    Run IDs are allocated inside a write transaction, so concurrent audits
+    (worker threads, batch processes, separate CLI runs) never share a
+    number. The TXT/JSON report files are still written alongside for the
+    existing viewers.
+    """
+    def __init__(self, audit_dir, check_same_thread=True):
+        self.audit_dir = audit_dir
+        os.makedirs(audit_dir, exist_ok=True)
+        # check_same_thread=False is for a store shared across threads behind the caller's own lock
+        self.conn = sqlite3.connect(os.path.join(audit_dir, STORE_FILE), timeout=30, isolation_level=None,
+                                    check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self._seed_from_files()
+
+    def _migrate(self):
+        # Stores created before PMV/PPD and room class were reported lack those columns
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(room_results)")]
+        for column, column_type in (("pmv", "REAL"), ("ppd", "REAL"), ("room_class", "TEXT")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE room_results ADD COLUMN {column} {column_type}")
+        # The delta row cache was keyed on the job alone; its rows cannot be assigned to a schedule file, so
+        # the cache starts empty (the next delta run of each job re-validates every row)
+        if "input_file" not in [row[1] for row in self.conn.execute("PRAGMA table_info(row_cache)")]:
+            self.conn.execute("DROP TABLE row_cache")
+            self.conn.executescript(SCHEMA)
+
+    def _seed_from_files(self):
+        # One-time import of audit_N.json files written before the store existed
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("SELECT value FROM meta WHERE key = 'next_run_id'").fetchone():
+                self.conn.execute("COMMIT")
+                return
+            highest = 0
+            for path in glob.glob(os.path.join(self.audit_dir, "audit_*.*")):
+                match = AUDIT_FILE_RE.search(os.path.basename(path))
+                if match:
+                    highest = max(highest, int(match.group(1)))
+            for run_id in range(1, highest + 1):
+                self._import_json_run(run_id)
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('next_run_id', ?)", (str(highest + 1),))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _import_json_run(self, run_id):
+        txt_path = os.path.join(self.audit_dir, f"audit_{run_id}.txt")
+        json_path = os.path.join(self.audit_dir, f"audit_{run_id}.json")
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r') as jf:
+                data = json.load(jf)
+        except (ValueError, OSError):
+            return
+        # A malformed legacy report (rows missing keys, wrong types) is skipped, not allowed to fail the store
+        self.conn.execute("SAVEPOINT import_run")
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, 'complete', ?, ?)",
+                (run_id, data.get("job_reference"), data.get("run_date"), data.get("input_file"), txt_path, json_path)
+            )
+            self._insert_rooms(run_id, data.get("rooms", []))
+            self._insert_equipment(run_id, data.get("equipment", []))
+        except (KeyError, TypeError, AttributeError):
+            self.conn.execute("ROLLBACK TO import_run")
+        self.conn.execute("RELEASE import_run")
+
+    def allocate_run(self, job_reference, input_file, txt_path=None, json_path=None):
+        """Atomically reserves the next run ID. Returns (run_id, txt_path, json_path)"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            run_id = int(self.conn.execute("SELECT value FROM meta WHERE key = 'next_run_id'").fetchone()[0])
+            self.conn.execute("UPDATE meta SET value = ? WHERE key = 'next_run_id'", (str(run_id + 1),))
+            txt_path = txt_path or os.path.join(self.audit_dir, f"audit_{run_id}.txt")
+            json_path = json_path or os.path.join(self.audit_dir, f"audit_{run_id}.json")
+            self.conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, 'running', ?, ?)",
+                (run_id, job_reference, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), input_file, txt_path, json_path)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return run_id, txt_path, json_path
+
+    def _insert_rooms(self, run_id, rooms):
+        self.conn.executemany(
+            "INSERT INTO room_results (run_id, name, ach, status, comfort, pmv, ppd, room_class)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, r["name"], r["ach"], r["status"], r["comfort"], r.get("pmv"), r.get("ppd"), r.get("class"))
+             for r in rooms]
+        )
+
+    def _insert_equipment(self, run_id, equipment):
+        self.conn.executemany(
+            "INSERT INTO equipment_results VALUES (?, ?, ?, ?, ?)",
+            [(run_id, e["mark"], e["category"], e["status"], e["issues"]) for e in equipment]
+        )
+
+    def _transaction(self, fn, *args):
+        # Autocommit connection: group each write into one explicit transaction
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            fn(*args)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def add_rooms(self, run_id, rooms):
+        self._transaction(self._insert_rooms, run_id, rooms)
+
+    def add_equipment(self, run_id, equipment):
+        self._transaction(self._insert_equipment, run_id, equipment)
+
+    def finish_run(self, run_id, run_date, status="complete"):
+        self._transaction(self.conn.execute, "UPDATE runs SET run_date = ?, status = ? WHERE run_id = ?",
+                          (run_date, status, run_id))
+
+    # --- Delta audit row cache: (job, schedule file, kind, row key) -> row hash + last result ---
+
+    def get_cached_rows(self, job_reference, input_file, kind, keys):
+        """Returns {row_key: (row_hash, result)} for keys seen in an earlier delta run"""
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT row_key, row_hash, result FROM row_cache"
+                f" WHERE job_reference = ? AND input_file = ? AND kind = ? AND row_key IN ({placeholders})",
+                [job_reference, input_file, kind] + chunk
+            ).fetchall()
+            for row_key, row_hash, result in rows:
+                found[row_key] = (row_hash, json.loads(result))
+        return found
+
+    def put_cached_rows(self, job_reference, input_file, kind, items, run_id):
+        """Upserts (row_key, row_hash, result) and stamps them as seen by run_id"""
+        self._transaction(self.conn.executemany,
+                          "INSERT OR REPLACE INTO row_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          [(job_reference, input_file, kind, key, row_hash, json.dumps(result), run_id)
+                           for key, row_hash, result in items])
+
+    def pop_stale_rows(self, job_reference, input_file, run_id):
+        """Removes and returns [(kind, row_key, result)] not seen by run_id (rows deleted from the schedule)"""
+        rows = self.conn.execute(
+            "SELECT kind, row_key, result FROM row_cache WHERE job_reference = ? AND input_file = ? AND last_seen != ?",
+            (job_reference, input_file, run_id)
+        ).fetchall()
+        self._transaction(self.conn.execute,
+                          "DELETE FROM row_cache WHERE job_reference = ? AND input_file = ? AND last_seen != ?",
+                          (job_reference, input_file, run_id))
+        return [(kind, key, json.loads(result)) for kind, key, result in rows]
+
+    def _query(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def runs(self, job_reference=None, since=None):
+        sql = "SELECT * FROM runs WHERE 1 = 1"
+        params = []
+        if job_reference:
+            sql += " AND job_reference = ?"
+            params.append(job_reference)
+        if since:
+            sql += " AND run_date >= ?"
+            params.append(since)
+        return self._query(sql + " ORDER BY run_id", params)
+
+    def room_results(self, job_reference=None, status=None, room=None):
+        """e.g. room_results(job_reference="PROJ-101", status="FAIL") across every run"""
+        sql = ("SELECT r.run_id, r.job_reference, r.run_date, rr.name, rr.ach, rr.status, rr.comfort, rr.pmv, rr.ppd,"
+               " rr.room_class"
+               " FROM room_results rr JOIN runs r USING (run_id) WHERE 1 = 1")
+        params = []
+        for column, value in (("r.job_reference", job_reference), ("rr.status", status), ("rr.name", room)):
+            if value:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        return self._query(sql + " ORDER BY r.run_id, rr.rowid", params)
+
+    def equipment_results(self, job_reference=None, status=None, mark=None):
+        sql = ("SELECT r.run_id, r.job_reference, r.run_date, e.mark, e.category, e.status, e.issues"
+               " FROM equipment_results e JOIN runs r USING (run_id) WHERE 1 = 1")
+        params = []
+        for column, value in (("r.job_reference", job_reference), ("e.status", status), ("e.mark", mark)):
+            if value:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        return self._query(sql + " ORDER BY r.run_id, e.rowid", params)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+import concurrent.futures
+
+import mep_validator_agent_v2 as validator
+import thermal_comfort
+import audit_analytics
+from job_queue import JobQueue
+
+# --- CONFIGURATION ---
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIT_DIR = os.path.join(PROJECT_DIR, "audit runs")
+ROOM_CSV_PATH = os.path.join(PROJECT_DIR, "RoomSchedule.csv")
+JOB_DB_PATH = os.path.join(AUDIT_DIR, "jobs.sqlite3")
+MAX_WORKERS = 4  # Concurrent requests served at once
+REINDEX_LOG_LINES = 50  # Tail of ingest_manuals.py output kept on the reindex job
+
+class AuditWorker(object):
+    """Long-lived process serving audit and RAG requests over stdin/stdout.
+
+    Protocol: one JSON object per line.
+      request:  {"id": 1, "method": "run_audit", "params": {"file": ..., "job": ...}}
+      response: {"id": 1, "result": {...}} or {"id": 1, "error": "..."}
+
+    Long audits and reindexes can instead go through submit_job, which
+    returns a job ID at once; the job's status and progress events are
+    pushed as notifications without an id:
+      {"method": "job_event", "params": {"job_id": ..., "seq": 3, "type": "progress", ...}}
+    """
+    METHODS = ("ping", "run_audit", "rag_query", "reload_index", "cache_stats",
+               "submit_job", "job_status", "job_events", "list_jobs", "analytics")
+
+    def __init__(self, rpc_out):
+        self.rpc_out = rpc_out
+        self.write_lock = threading.Lock()
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        os.makedirs(AUDIT_DIR, exist_ok=True)
+        self.jobs = JobQueue(JOB_DB_PATH, {"run_audit": self.audit_job, "reindex": self.reindex_job},
+                             on_event=lambda event: self.respond({"method": "job_event", "params": event}))
+        # One connection for dashboard views. Runs finished before this process started are rolled up here;
+        # audits run by this worker roll themselves up (run_audit -> apply_run), and analytics() rolls up any
+        # run that missed it (a failed rollup, CLI or batch runs) before answering
+        self.analytics_lock = threading.Lock()
+        self.analytics_store = validator.AuditStore(AUDIT_DIR, check_same_thread=False)
+        self.audit_analytics = audit_analytics.AuditAnalytics(self.analytics_store)
+        self.audit_analytics.catch_up()
+
+    def ping(self, params):
+        return {"pid": os.getpid()}
+
+    def audit_job(self, params, progress=None):
+        """Runs one audit; returns its summary (report paths and counts)"""
+        csv_path = params["file"]
+        job_reference = params["job"]
+        # One store connection per request thread; run IDs are allocated atomically
+        store = validator.AuditStore(AUDIT_DIR)
+        run_id, audit_txt, audit_json = store.allocate_run(job_reference, os.path.basename(csv_path))
+
+        audit_args = (csv_path, job_reference, ROOM_CSV_PATH, audit_txt, audit_json, store, run_id)
+        try:
+            if params.get("profile"):
+                # cProfile trace of this request's thread, next to the reports
+                summary = validator.profiled(os.path.splitext(audit_json)[0] + ".prof", validator.run_audit,
+                                             *audit_args, quiet=True, progress=progress,
+                                             citations=bool(params.get("citations")))
+            else:
+                summary = validator.run_audit(*audit_args, quiet=True, progress=progress,
+                                              citations=bool(params.get("citations")))
+        except Exception:
+            validator.fail_run(store, run_id)
+            raise
+        finally:
+            store.close()
+        return dict(summary, run_id=run_id)
+
+    def run_audit(self, params):
+        summary = self.audit_job(params)
+        with open(summary["audit_json"], 'r') as jf:
+            return json.load(jf)
+
+    def reindex_job(self, params, progress):
+        """Runs ingest_manuals.py in a child process (it forks its own parse pool) and relays its progress"""
+        import ingest_manuals
+        cmd = [sys.executable, os.path.join(PROJECT_DIR, "ingest_manuals.py"), "--progress"]
+        if params.get("rebuild"):
+            cmd.append("--rebuild")
+        log = []
+        with subprocess.Popen(cmd, cwd=PROJECT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True) as proc:
+            for line in proc.stdout:
+                line = line.rstrip("\n")
+                if line.startswith(ingest_manuals.PROGRESS_PREFIX):
+                    progress(**json.loads(line[len(ingest_manuals.PROGRESS_PREFIX):]))
+                else:
+                    log = (log + [line])[-REINDEX_LOG_LINES:]
+        if proc.returncode != 0:
+            raise RuntimeError(f"ingest_manuals.py exited with {proc.returncode}: " + "\n".join(log[-5:]))
+        # Swap in the new index for queries
+        self.reload_index(params)
+        return {"log": "\n".join(log)}
+
+    def submit_job(self, params):
+        kind = params.get("kind")
+        # Reindexes always cover the whole manuals folder, so a queued one absorbs later requests
+        coalesce_key = "reindex" if kind == "reindex" else None
+        job, coalesced = self.jobs.submit(kind, params.get("params"), coalesce_key)
+        return dict(job, coalesced=coalesced)
+
+    def job_status(self, params):
+        job = self.jobs.status(params["job_id"])
+        if job is None:
+            raise ValueError(f"Unknown job: {params['job_id']}")
+        return job
+
+    def job_events(self, params):
+        return self.jobs.events(params["job_id"], params.get("since", 0))
+
+    def list_jobs(self, params):
+        return self.jobs.list(params.get("limit", 50))
+
+    def analytics(self, params):
+        """Cross-run dashboard view, e.g. {"view": "recurring_failures", "job": "PROJ-101"}"""
+        with self.analytics_lock:
+            # Checking for missed runs is a plain read; the write lock is only taken when there are some
+            if self.audit_analytics.pending_runs():
+                self.audit_analytics.catch_up()
+            return audit_analytics.answer_view(self.audit_analytics, params.get("view"), params)
+
+    def rag_query(self, params):
+        # Imported on first use so audits work without the RAG stack installed
+        import query_manuals
+        return query_manuals.query_vector_db(params["query"])
+
+    def reload_index(self, params):
+        import query_manuals
+        query_manuals.reset_vectorstore()
+        return {"reloaded": True}
+
+    def cache_stats(self, params):
+        import query_manuals
+        return query_manuals.get_query_cache().get_stats()
+
+    def respond(self, message):
+        line = json.dumps(message)
+        with self.write_lock:
+            self.rpc_out.write(line + "\n")
+            self.rpc_out.flush()
+
+    def handle(self, request):
+        request_id = request.get("id")
+        method = request.get("method")
+        if method not in self.METHODS:
+            return self.respond({"id": request_id, "error": f"Unknown method: {method}"})
+        try:
+            result = getattr(self, method)(request.get("params") or {})
+            self.respond({"id": request_id, "result": result})
+        except Exception as e:
+            self.respond({"id": request_id, "error": str(e)})
+
+    def serve(self, rpc_in):
+        for line in rpc_in:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.respond({"id": None, "error": "Invalid JSON request"})
+                continue
+            self.pool.submit(self.handle, request)
+        self.pool.shutdown(wait=True)
+
+if __name__ == "__main__":
+    # Real stdout carries JSON-RPC only; stray print() output goes to stderr
+    rpc_out = sys.stdout
+    sys.stdout = sys.stderr
+    worker = AuditWorker(rpc_out)
+    # The PMV model JIT-compiles for seconds on import; do it off the request path
+    threading.Thread(target=thermal_comfort.warm_up, daemon=True).start()
+    worker.serve(sys.stdin)
@@ -0,0 +1,57 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from thermal_comfort import ComfortEvaluator, pmv_ppd, AIR_SPEED, METABOLIC_RATE, CLOTHING, COMFORT_LIMIT
+
+# --- CONFIGURATION ---
+SIZES = [1_000, 100_000, 1_000_000]
+
+def make_conditions(n, seed=42):
+    # Room schedules repeat a small set of design setpoints, plus some measured (0.1 resolution) values
+    rng = random.Random(seed)
+    temps = [rng.choice([20.0, 21.0, 22.0, 23.0]) if rng.random() < 0.7 else round(rng.uniform(17, 29), 1)
+             for _ in range(n)]
+    humidity = [rng.choice([40.0, 45.0, 50.0]) if rng.random() < 0.7 else round(rng.uniform(25, 75), 1)
+                for _ in range(n)]
+    return np.array(temps), np.array(humidity)
+
+def run_uncached(temp, humidity):
+    res = pmv_ppd(tdb=temp, tr=temp, vr=AIR_SPEED, rh=humidity, met=METABOLIC_RATE, clo=CLOTHING)
+    return np.asarray(res['pmv'], dtype=float)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Thermal comfort throughput and grid accuracy benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    grid = ComfortEvaluator(grid=True)
+    print(f"Grid build: {time.perf_counter() - start:.2f}s | stated max PMV error: {grid.max_error:.4f}\n")
+
+    print(f"{'Rooms':>10} | {'Uncached/s':>12} | {'Memoized/s':>12} | {'Grid/s':>12} | {'Max |dPMV|':>10} | Labels equal")
+    print("-" * 82)
+    for n in args.sizes:
+        temp, humidity = make_conditions(n)
+        exact, uncached_time = timed(run_uncached, temp, humidity)
+        (memo_pmv, _), memo_time = timed(ComfortEvaluator().evaluate_many, temp, humidity)
+        # Fresh grid cache per size; the grid itself is reused
+        grid.cache.clear()
+        (grid_pmv, _), grid_time = timed(grid.evaluate_many, temp, humidity)
+
+        defined = ~np.isnan(exact)
+        assert np.array_equal(memo_pmv[defined], exact[defined]), "memoized PMV differs from the exact model"
+        error = float(np.max(np.abs(grid_pmv[defined] - exact[defined]))) if defined.any() else 0.0
+        labels_equal = np.array_equal(np.abs(grid_pmv) < COMFORT_LIMIT, np.abs(exact) < COMFORT_LIMIT)
+        print(f"{n:>10} | {n / uncached_time:>12,.0f} | {n / memo_time:>12,.0f} | {n / grid_time:>12,.0f} | "
+              f"{error:>10.4f} | {'yes' if labels_equal else 'NO'}")
+
+if __name__ == "__main__":
+    main()
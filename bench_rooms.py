@@ -0,0 +1,56 @@
+import argparse
+import random
+import time
+
+from mep_validator_agent_v2 import LabMEPAgent, rooms_to_columns
+
+# --- CONFIGURATION ---
+SIZES = [1_000, 100_000, 1_000_000]
+SCALAR_LIMIT = 10_000  # The per-room loop is only timed (and cross-checked) up to this size
+ROOM_CLASSES = ["ISO_7", "ISO_8", "BSL_3", "UNCLASSIFIED"]
+
+def make_rooms(n, seed=42):
+    rng = random.Random(seed)
+    return [{
+        "name": f"Room {i:07d}",
+        "class": rng.choice(ROOM_CLASSES),
+        "area": rng.uniform(8, 120),
+        "height": rng.choice([2.7, 3.0, 3.5]),
+        "supply_airflow_m3h": rng.uniform(50, 9000),
+        "temp": float(rng.randint(18, 26)),
+        "humidity": float(rng.choice([35, 40, 45, 50, 55]))
+    } for i in range(n)]
+
+def run_scalar(agent, rooms):
+    return [(agent.validate_ventilation(room), agent.check_thermal_comfort(room)) for room in rooms]
+
+def run_batch(agent, columns):
+    return list(agent.iter_room_results(agent.validate_rooms_batch(columns)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Room validation throughput benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    agent = LabMEPAgent()
+    print(f"{'Rooms':>10} | {'Scalar rooms/s':>15} | {'Batch rooms/s':>15} | {'Speedup':>8} | Identical")
+    print("-" * 70)
+    for n in args.sizes:
+        rooms = make_rooms(n)
+        columns = rooms_to_columns(rooms)
+
+        start = time.perf_counter()
+        batch_results = run_batch(agent, columns)
+        batch_rate = n / (time.perf_counter() - start)
+
+        if n <= SCALAR_LIMIT:
+            start = time.perf_counter()
+            scalar_results = run_scalar(agent, rooms)
+            scalar_rate = n / (time.perf_counter() - start)
+            identical = "yes" if scalar_results == batch_results else "NO"
+            print(f"{n:>10} | {scalar_rate:>15,.0f} | {batch_rate:>15,.0f} | {batch_rate / scalar_rate:>7.1f}x | {identical}")
+        else:
+            print(f"{n:>10} | {'-':>15} | {batch_rate:>15,.0f} | {'-':>8} | -")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import random
+import time
+
+from mep_validator_agent_v2 import LabMEPAgent
+from equipment_rules import ANY_CATEGORY, load_rules, compile_rules
+
+# --- CONFIGURATION ---
+ROWS = 200_000
+EXTRA_RULES = 50  # Synthetic rules added per category for the scaling run
+CATEGORIES = ["Fan", "Pump", "Chiller", "Terminal Unit", "Condensing Unit", "Boiler"]
+NUMERIC_CELLS = ["150", "0.5", "0", "-", "", "65", "abc", "nan", "-inf"]
+POWER_CELLS = ["460/3/60", "120/1/60", "277/1/60", "", "480V"]
+
+def legacy_validate_equipment(equipment_row):
+    """The hard-coded validate_equipment this engine replaced, kept as the reference"""
+    category = equipment_row.get('Category', '')
+    mark = equipment_row.get('Mark', '')
+    status = "PASS"
+    issues = []
+
+    try:
+        if category == 'Fan':
+            sp_str = equipment_row.get('Static Pressure (in wg)', '0')
+            sp = float(sp_str) if sp_str and sp_str != '-' else 0
+            if sp <= 0:
+                status = "FAIL"
+                issues.append("Zero/Missing static pressure")
+
+        if category == 'Pump':
+            flow_str = equipment_row.get('Flow Rate (GPM)', '0')
+            flow = float(flow_str) if flow_str and flow_str != '-' else 0
+            if flow <= 0:
+                status = "FAIL"
+                issues.append("Missing flow rate")
+    except ValueError:
+        status = "FAIL"
+        issues.append("Invalid numeric data")
+
+    power = equipment_row.get('Power (V/PH/Hz)', '')
+    if not power or '/' not in power:
+        status = "FAIL"
+        issues.append("Invalid power format")
+
+    return {
+        "mark": mark,
+        "category": category,
+        "status": status,
+        "issues": ", ".join(issues) if issues else "None"
+    }
+
+def make_rows(n, seed=7):
+    rng = random.Random(seed)
+    return [{
+        "Mark": f"EQ-{i:06d}",
+        "Category": rng.choice(CATEGORIES),
+        "Flow Rate (GPM)": rng.choice(NUMERIC_CELLS),
+        "Static Pressure (in wg)": rng.choice(NUMERIC_CELLS),
+        "Power (V/PH/Hz)": rng.choice(POWER_CELLS)
+    } for i in range(n)]
+
+def with_extra_rules(rules, n):
+    """Pads every category with n numeric/text rules over the existing columns"""
+    columns = ["Flow Rate (GPM)", "Static Pressure (in wg)"]
+    padded = {}
+    for category, category_rules in rules.items():
+        if category == ANY_CATEGORY:
+            padded[category] = category_rules
+            continue
+        extra = []
+        for i in range(n):
+            if i % 2:
+                extra.append({"column": "Power (V/PH/Hz)", "check": "required", "issue": f"Rule {i}"})
+            else:
+                extra.append({"column": columns[i % 4 // 2], "check": "max", "value": 1e6 + i, "issue": f"Rule {i}"})
+        padded[category] = list(category_rules) + extra
+    return padded
+
+def time_rows(fn, rows):
+    start = time.perf_counter()
+    results = [fn(row) for row in rows]
+    return results, len(rows) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Equipment rule engine micro-benchmark")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--extra-rules", type=int, default=EXTRA_RULES)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    agent = LabMEPAgent()
+
+    legacy_results, legacy_rate = time_rows(legacy_validate_equipment, rows)
+    compiled_results, compiled_rate = time_rows(agent.validate_equipment, rows)
+
+    print(f"Rows: {args.rows:,}")
+    print(f"Legacy   : {legacy_rate:>12,.0f} rows/s")
+    print(f"Compiled : {compiled_rate:>12,.0f} rows/s ({compiled_rate / legacy_rate:.2f}x)")
+    print(f"Identical: {'yes' if legacy_results == compiled_results else 'NO'}")
+
+    # Per-row cost as the rule table grows
+    agent.equipment_checks, agent.default_equipment_check = compile_rules(with_extra_rules(load_rules(), args.extra_rules))
+    _, scaled_rate = time_rows(agent.validate_equipment, rows)
+    print(f"Compiled + {args.extra_rules} rules/category: {scaled_rate:>12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
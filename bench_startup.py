@@ -0,0 +1,64 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import time
+
+# --- CONFIGURATION ---
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNS = 5
+PING = '{"id": 1, "method": "ping"}\n'
+
+def entry_points(work_dir):
+    """(name, argv, stdin, budget_ms); budgets are wall time including interpreter startup"""
+    equipment_only = (
+        "import mep_validator_agent_v2 as m; "
+        f"m.run_audit('MEPComponents.csv', 'BENCH', {os.path.join(work_dir, 'no_rooms.csv')!r}, "
+        f"{os.path.join(work_dir, 'audit.txt')!r}, {os.path.join(work_dir, 'audit.json')!r}, quiet=True)"
+    )
+    with_rooms = equipment_only.replace(repr(os.path.join(work_dir, 'no_rooms.csv')), "'RoomSchedule.csv'")
+    return [
+        ("python (baseline)", ["-c", "pass"], None, 100),
+        ("validator: argument error", ["mep_validator_agent_v2.py", "--no-such-flag"], None, 150),
+        ("validator: --help", ["mep_validator_agent_v2.py", "--help"], None, 150),
+        ("validator: equipment-only audit", ["-c", equipment_only], None, 250),
+        # Pays for numpy + pythermalcomfort (numba JIT) on first PMV; tracked so it does not creep
+        ("validator: audit with rooms", ["-c", with_rooms], None, 15000),
+        ("query_manuals: no query", ["query_manuals.py"], None, 150),
+        ("ingest_manuals: import", ["-c", "import ingest_manuals"], None, 150),
+        ("audit_worker: ping", ["audit_worker.py"], PING, 200),
+    ]
+
+def measure(argv, stdin, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore"] + argv, input=stdin, text=True, cwd=PROJECT_DIR,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time of each entry point against its budget")
+    parser.add_argument("--runs", type=int, default=RUNS, help="Runs per entry point (median is reported)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="mep_startup_")
+    over = 0
+    try:
+        print(f"{'Entry point':<34} | {'Median ms':>10} | {'Budget ms':>10} | OK")
+        print("-" * 66)
+        for name, argv, stdin, budget in entry_points(work_dir):
+            median = measure(argv, stdin, args.runs)
+            ok = median <= budget
+            over += not ok
+            print(f"{name:<34} | {median:>10.0f} | {budget:>10} | {'yes' if ok else 'NO'}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(1 if over else 0)
+
+if __name__ == "__main__":
+    main()
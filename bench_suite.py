@@ -0,0 +1,250 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime
+
+import thermal_comfort
+import mep_validator_agent_v2 as agent_module
+from mep_validator_agent_v2 import LabMEPAgent, ReportSink, iter_room_rows, run_audit
+from embedding_cache import CachedEmbeddings, EmbeddingCache, HashEmbeddings
+from synthetic_schedules import write_room_schedule, write_equipment_schedule, write_manual_pdf
+
+# --- CONFIGURATION ---
+RESULTS_DIR = "bench_results"  # One JSON file per run: <date>_<commit>.json
+ROOMS = 100_000
+EQUIPMENT = 100_000
+MALFORMED = 0.05
+MANUALS = 4
+PAGES = 25
+QUERIES = ["minimum air changes per hour for ISO 7", "HEPA filter leak test", "differential pressure cascade",
+           "BSL-3 containment exhaust", "relative humidity limits", "recovery time particle count",
+           "grade A unidirectional airflow", "alarm set point commissioning"]
+REGRESSION_THRESHOLD = 0.10  # --compare flags stages more than 10% slower
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def timed(fn, repeat=1):
+    """Best-of-`repeat` wall time; returns (last result, seconds)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def stage(seconds, rows=None, **extra):
+    entry = {"seconds": round(seconds, 6)}
+    if rows is not None:
+        entry["rows"] = rows
+        entry["rows_per_sec"] = round(rows / seconds, 1) if seconds else None
+    entry.update(extra)
+    return entry
+
+def bench_schedules(work_dir, rooms_n, equipment_n, malformed, seed, repeat):
+    room_csv = write_room_schedule(os.path.join(work_dir, "RoomSchedule.csv"), rooms_n, malformed / 2, seed)
+    equipment_csv = write_equipment_schedule(os.path.join(work_dir, "MEPComponents.csv"), equipment_n, malformed, seed)
+    stages = {}
+
+    # The PMV model loads lazily; time its import separately from the per-room stages
+    _, seconds = timed(thermal_comfort.warm_up)
+    stages["import_pmv_model"] = stage(seconds)
+
+    rooms, seconds = timed(lambda: agent_module.load_rooms_from_csv(room_csv), repeat)
+    stages["load_rooms"] = stage(seconds, rooms_n, loaded=len(rooms))
+    equipment, seconds = timed(lambda: agent_module.load_equipment_from_csv(equipment_csv), repeat)
+    stages["load_equipment"] = stage(seconds, equipment_n, loaded=len(equipment))
+
+    agent = LabMEPAgent()
+    _, seconds = timed(lambda: [agent.validate_ventilation(room) for room in rooms], repeat)
+    stages["validate_ventilation"] = stage(seconds, len(rooms))
+
+    def comfort_pass():
+        # A fresh agent per repeat, so the PMV memo starts cold every time
+        comfort_agent = LabMEPAgent()
+        return [comfort_agent.check_thermal_comfort(room) for room in rooms]
+
+    _, seconds = timed(comfort_pass, repeat)
+    stages["check_thermal_comfort"] = stage(seconds, len(rooms))
+    room_rows, seconds = timed(lambda: list(iter_room_rows(LabMEPAgent(), rooms)), repeat)
+    stages["validate_rooms_batch"] = stage(seconds, len(rooms))
+    equipment_rows, seconds = timed(lambda: [agent.validate_equipment(row) for row in equipment], repeat)
+    stages["validate_equipment"] = stage(seconds, len(equipment),
+                                         failed=sum(1 for row in equipment_rows if row["status"] == "FAIL"))
+
+    def write_reports(formats):
+        txt, json_path = os.path.join(work_dir, "bench.txt"), os.path.join(work_dir, "bench.json")
+        sink = ReportSink(txt, json_path, {"job_reference": "BENCH"}, quiet=True, formats=formats)
+        sink.begin_section("rooms")
+        for row in room_rows:
+            sink.room(row)
+        sink.end_section()
+        sink.begin_section("equipment")
+        for row in equipment_rows:
+            sink.equipment(row)
+        sink.end_section()
+        sink.close()
+        return sum(os.path.getsize(path) for path in sink.paths.values())
+
+    rows = len(room_rows) + len(equipment_rows)
+    written, seconds = timed(lambda: write_reports(()), repeat)
+    stages["report_writing"] = stage(seconds, rows, bytes=written)
+    written, seconds = timed(lambda: write_reports(("csv", "ndjson")), repeat)
+    stages["report_writing_all_formats"] = stage(seconds, rows, bytes=written)
+
+    out_dir = os.path.join(work_dir, "audit")
+    os.makedirs(out_dir, exist_ok=True)
+    summary, seconds = timed(lambda: run_audit(equipment_csv, "BENCH", room_csv, os.path.join(out_dir, "audit.txt"),
+                                               os.path.join(out_dir, "audit.json"), quiet=True), repeat)
+    stages["run_audit"] = stage(seconds, summary["rooms"] + summary["equipment"])
+    return stages
+
+def bench_rag(work_dir, manuals, pages, seed):
+    """Ingest + query against synthetic PDFs with the HashEmbeddings stub (no Ollama needed)"""
+    try:
+        import ingest_manuals
+        import query_manuals
+    except ImportError as e:
+        return {"skipped": f"RAG dependencies missing: {e}"}
+
+    manuals_dir = os.path.join(work_dir, "manuals")
+    db_path = os.path.join(work_dir, "local_db")
+    os.makedirs(manuals_dir, exist_ok=True)
+    for index in range(manuals):
+        write_manual_pdf(os.path.join(manuals_dir, f"Synthetic_Manual_{index + 1:02d}.pdf"), pages, seed + index)
+
+    ingest_manuals.SOURCE_DIRECTORY = manuals_dir
+    ingest_manuals.DB_PATH = db_path
+    ingest_manuals.MANIFEST_PATH = os.path.join(db_path, "ingest_manifest.json")
+    query_manuals.DB_PATH = db_path
+
+    def embeddings():
+        # Private cache file, so stub vectors never mix with the real Ollama cache
+        return CachedEmbeddings(HashEmbeddings(), "hash-stub", cache=EmbeddingCache(os.path.join(work_dir, "emb.sqlite3")))
+
+    stages = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        timings, seconds = timed(lambda: ingest_manuals.ingest_pdfs(rebuild=True, embeddings=embeddings()))
+        stages["ingest_cold"] = stage(seconds, timings["chunks"], pages=timings["pages"],
+                                      **{f"{name}_seconds": round(timings[name], 6)
+                                         for name in ("parse", "split", "embed", "write")})
+        _, seconds = timed(lambda: ingest_manuals.ingest_pdfs(embeddings=embeddings()))
+        stages["ingest_noop"] = stage(seconds)
+        write_manual_pdf(os.path.join(manuals_dir, "Synthetic_Manual_01.pdf"), pages, seed + 1000)
+        timings, seconds = timed(lambda: ingest_manuals.ingest_pdfs(embeddings=embeddings()))
+        stages["ingest_one_changed"] = stage(seconds, timings["chunks"])
+
+    query_manuals.reset_vectorstore()
+    query_manuals.get_vectorstore(embeddings=embeddings())
+    query_manuals.get_query_cache(os.path.join(work_dir, "queries.sqlite3"))
+    for name in ("query_cold", "query_cached"):
+        results, seconds = timed(lambda: [query_manuals.query_vector_db(q) for q in QUERIES])
+        errors = [r["error"] for r in results if "error" in r]
+        stages[name] = stage(seconds, len(QUERIES), errors=errors[:1])
+
+    # Same queries through the int8 memory-mapped backend (fresh generation key, so uncached)
+    query_manuals.VECTOR_BACKEND = "quantized"
+    query_manuals.reset_vectorstore()
+    query_manuals.get_embeddings(embeddings())
+    try:
+        results, seconds = timed(lambda: [query_manuals.query_vector_db(q) for q in QUERIES])
+    finally:
+        query_manuals.VECTOR_BACKEND = "chroma"
+        # Closes the quantized index's vector file
+        query_manuals.reset_vectorstore()
+    errors = [r["error"] for r in results if "error" in r]
+    stages["query_quantized_cold"] = stage(seconds, len(QUERIES), errors=errors[:1])
+    return stages
+
+def compare(current, previous_path):
+    with open(previous_path, 'r') as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous.get('commit')} ({previous_path}):")
+    if previous.get("params") != current["params"]:
+        print("[!] Parameters differ; staged rows are compared per row, other stages by total time")
+    print(f"{'Stage':<30} | {'Before (s)':>10} | {'After (s)':>10} | {'Change':>8}")
+    print("-" * 68)
+    regressions = 0
+    for group in ("schedules", "rag"):
+        for name, entry in current.get(group, {}).items():
+            before = previous.get(group, {}).get(name)
+            if not isinstance(entry, dict) or not isinstance(before, dict) or not before.get("seconds"):
+                continue
+            if entry.get("rows") and before.get("rows"):
+                change = (entry["seconds"] / entry["rows"]) / (before["seconds"] / before["rows"]) - 1
+            else:
+                change = entry["seconds"] / before["seconds"] - 1
+            flag = " <-- slower" if change > REGRESSION_THRESHOLD else ""
+            regressions += bool(flag)
+            print(f"{name:<30} | {before['seconds']:>10.4f} | {entry['seconds']:>10.4f} | {change:>+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="MEP audit benchmark suite (synthetic schedules + stub-embedder RAG)")
+    parser.add_argument("--rooms", type=int, default=ROOMS)
+    parser.add_argument("--equipment", type=int, default=EQUIPMENT)
+    parser.add_argument("--malformed", type=float, default=MALFORMED, help="Fraction of malformed cells")
+    parser.add_argument("--manuals", type=int, default=MANUALS)
+    parser.add_argument("--pages", type=int, default=PAGES, help="Pages per synthetic manual")
+    parser.add_argument("--repeat", type=int, default=1, help="Best-of-N timing for schedule stages")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-rag", action="store_true", help="Skip the ingest/query stages")
+    parser.add_argument("--out", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "run_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "params": {key: getattr(args, key) for key in ("rooms", "equipment", "malformed", "manuals", "pages",
+                                                       "repeat", "seed")},
+    }
+    work_dir = tempfile.mkdtemp(prefix="mep_bench_")
+    try:
+        results["schedules"] = bench_schedules(work_dir, args.rooms, args.equipment, args.malformed,
+                                               args.seed, args.repeat)
+        results["rag"] = {"skipped": "--skip-rag"} if args.skip_rag else bench_rag(work_dir, args.manuals,
+                                                                                     args.pages, args.seed)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'Stage':<30} | {'Seconds':>10} | {'Rows/s':>12}")
+    print("-" * 58)
+    for group in ("schedules", "rag"):
+        if "skipped" in results[group]:
+            print(f"{group:<30} | skipped: {results[group]['skipped']}")
+            continue
+        for name, entry in results[group].items():
+            rate = f"{entry['rows_per_sec']:,.0f}" if entry.get("rows_per_sec") else "-"
+            print(f"{name:<30} | {entry['seconds']:>10.4f} | {rate:>12}")
+
+    os.makedirs(args.out, exist_ok=True)
+    out_path = os.path.join(args.out, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['commit']}.json")
+    with open(out_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults saved to:\n - {out_path}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
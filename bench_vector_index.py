@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from quantized_index import QuantizedIndex
+
+# --- CONFIGURATION ---
+ROWS = 50_000
+DIM = 768           # nomic-embed-text
+QUERIES = 200
+TOP_K = 6
+COLLECTION = "langchain"  # Collection name LangChain's Chroma wrapper uses
+CHROMA_BATCH = 5000       # Chroma caps rows per add()
+
+def make_corpus(rows, dim, queries, seed=42):
+    """Unit vectors in topic clusters (like chunks of related manuals); queries are perturbed chunks"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(rows // 50, 1), dim)).astype(np.float32)
+    vectors = centres[rng.integers(len(centres), size=rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(rows, size=queries)
+    query_vectors = vectors[picks] + 0.05 * rng.standard_normal((queries, dim)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vectors, query_vectors
+
+def exact_top_k(vectors, query_vectors, k):
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    return [np.argsort(norms - 2 * vectors @ q, kind="stable")[:k] for q in query_vectors]
+
+def build(work_dir, vectors):
+    ids = [f"chunk-{i:07d}" for i in range(len(vectors))]
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(work_dir, "chroma"))
+    collection = client.get_or_create_collection(COLLECTION)
+    start = time.perf_counter()
+    for offset in range(0, len(ids), CHROMA_BATCH):
+        collection.add(ids=ids[offset:offset + CHROMA_BATCH], embeddings=vectors[offset:offset + CHROMA_BATCH])
+    chroma_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    QuantizedIndex(work_dir).add(ids, vectors)
+    quantized_seconds = time.perf_counter() - start
+    return {"chroma": chroma_seconds, "quantized": quantized_seconds}
+
+def rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def run_backend(backend, work_dir, queries_path, k):
+    """Child process: open one backend cold, run every query, report ids/latency/RSS"""
+    query_vectors = np.load(queries_path)
+    if backend == "chroma":
+        import chromadb
+    # BLAS allocates its thread buffers on first use; keep that out of the index's memory
+    np.ones((64, 64), dtype=np.float32) @ np.ones(64, dtype=np.float32)
+    baseline = rss_mb()
+    if backend == "chroma":
+        collection = chromadb.PersistentClient(path=os.path.join(work_dir, "chroma")).get_collection(COLLECTION)
+        search = lambda q: collection.query(query_embeddings=[q], n_results=k)["ids"][0]
+    else:
+        index = QuantizedIndex(work_dir)
+        search = lambda q: [chunk_id for chunk_id, _ in index.search(q, k)]
+
+    results, latencies = [], []
+    for q in query_vectors:
+        start = time.perf_counter()
+        results.append(search(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(json.dumps({"ids": results, "latency_ms": latencies, "rss_mb": rss_mb() - baseline}))
+
+def measure(backend, work_dir, queries_path, k):
+    out = subprocess.run([sys.executable, "-W", "ignore", os.path.abspath(__file__), "--run-backend", backend,
+                          "--work-dir", work_dir, "--queries-file", queries_path, "--k", str(k)],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def dir_mb(path, prefix=""):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files if f.startswith(prefix))
+    return total / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized index vs Chroma: recall@k, latency and memory")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--dim", type=int, default=DIM)
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--run-backend", choices=["chroma", "quantized"], help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_backend:
+        return run_backend(args.run_backend, args.work_dir, args.queries_file, args.k)
+
+    vectors, query_vectors = make_corpus(args.rows, args.dim, args.queries, args.seed)
+    truth = [set(f"chunk-{i:07d}" for i in top) for top in exact_top_k(vectors, query_vectors, args.k)]
+    work_dir = tempfile.mkdtemp(prefix="mep_vectors_")
+    try:
+        build_seconds = build(work_dir, vectors)
+        queries_path = os.path.join(work_dir, "queries.npy")
+        np.save(queries_path, query_vectors)
+        del vectors
+
+        sizes = {"chroma": dir_mb(os.path.join(work_dir, "chroma")), "quantized": dir_mb(work_dir, "quantized_index")}
+        print(f"{args.rows:,} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k} vs exact search\n")
+        print(f"{'Backend':<10} | {'Build s':>8} | {'Disk MB':>8} | {'RSS MB':>7} | {'Recall':>7} | "
+              f"{'p50 ms':>7} | {'p95 ms':>7}")
+        print("-" * 74)
+        for backend in ("chroma", "quantized"):
+            result = measure(backend, work_dir, queries_path, args.k)
+            recall = np.mean([len(truth[i] & set(ids)) / args.k for i, ids in enumerate(result["ids"])])
+            p50, p95 = np.percentile(result["latency_ms"], [50, 95])
+            print(f"{backend:<10} | {build_seconds[backend]:>8.2f} | {sizes[backend]:>8.1f} | {result['rss_mb']:>7.1f} | "
+                  f"{recall:>7.3f} | {p50:>7.2f} | {p95:>7.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
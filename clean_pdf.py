@@ -1,47 +1,89 @@
 import os
-from pypdf import PdfReader, PdfWriter
+import json
+import argparse
 
 # --- CONFIGURATION ---
-INPUT_FILE = "/home/richm/Documents/AG_Project2/audit-viewer/manuals/nih_design_requirements_rev_2.1_2024.pdf"  # The file you downloaded
-OUTPUT_FILE = "/home/richm/Documents/AG_Project2/audit-viewer/manuals/nih_design_requirements_rev_2.1_2024_clean.pdf" # The new file to save
-PAGES_TO_REMOVE = 31  # How many pages to cut from the start
-
-def remove_front_matter(input_path, output_path, pages_to_cut):
-    # 1. Validation
-    if not os.path.exists(input_path):
-        print(f"Error: Could not find file '{input_path}'")
-        return
-
-    print(f"Processing: {input_path}")
-    
-    try:
-        reader = PdfReader(input_path)
-        writer = PdfWriter()
-        
-        total_pages = len(reader.pages)
-        print(f"Total pages detected: {total_pages}")
-
-        # Safety check: Don't cut if the file is too short
-        if total_pages <= pages_to_cut:
-            print("Error: You are trying to remove more pages than the file contains!")
-            return
-
-        # 2. Loop through pages, skipping the first X
-        # We start the loop at 'pages_to_cut' and go to the end
-        print(f"Removing first {pages_to_cut} pages...")
-        for i in range(pages_to_cut, total_pages):
-            page = reader.pages[i]
-            writer.add_page(page)
-
-        # 3. Save the new file
-        with open(output_path, "wb") as f_out:
-            writer.write(f_out)
-        
-        print(f"Success! Saved clean version to: {output_path}")
-        print(f"New page count: {len(writer.pages)}")
-
-    except Exception as e:
-        print(f"An error occurred: {e}")
+MANUALS_DIRECTORY = "/home/richm/Documents/AG_Project2/audit-viewer/manuals"
+# Per-manual source URL, SHA-256 and page range to index (first_page/last_page, 1-indexed, inclusive)
+MANUALS_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manuals.json")
+
+def load_manuals_config(path=MANUALS_CONFIG):
+    """filename -> {"url", "sha256", optional "first_page"/"last_page"}; {} if there is no config"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def page_range(entry):
+    """(first, last) pages to keep, 1-indexed and inclusive; last is None for 'to the end'.
+
+    Returns None when the whole document is kept.
+    """
+    first = (entry or {}).get("first_page") or 1
+    last = (entry or {}).get("last_page")
+    if first < 1 or (last is not None and last < first):
+        raise ValueError(f"Invalid page range {first}-{last}")
+    if first == 1 and last is None:
+        return None
+    return first, last
+
+def page_ranges(config):
+    """filename -> (first, last) for the manuals that are trimmed"""
+    return {filename: page_range(entry) for filename, entry in config.items() if page_range(entry)}
+
+def in_range(page, pages):
+    """page is 1-indexed; pages is a page_range() result"""
+    return pages is None or (page >= pages[0] and (pages[1] is None or page <= pages[1]))
+
+def check_trim(input_path, pages):
+    """Checks the range against the PDF's page count (no page content is read); returns the count"""
+    from pypdf import PdfReader
+
+    total_pages = len(PdfReader(input_path).pages)
+    if pages and (pages[0] > total_pages or (pages[1] or total_pages) > total_pages):
+        raise ValueError(f"Page range {pages[0]}-{pages[1] or 'end'} is outside the {total_pages} pages "
+                         f"of {os.path.basename(input_path)}")
+    return total_pages
+
+def write_trimmed(input_path, output_path, pages):
+    """Writes a standalone copy holding only the kept pages.
+
+    Ingestion does not need this (ingest_manuals.py skips pages outside the
+    configured range as it reads); it is for sharing a trimmed manual.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(input_path)
+    writer = PdfWriter()
+    total_pages = check_trim(input_path, pages)
+    for number in range(1, total_pages + 1):
+        if in_range(number, pages):
+            writer.add_page(reader.pages[number - 1])
+    with open(output_path, "wb") as f_out:
+        writer.write(f_out)
+    return len(writer.pages)
 
 if __name__ == "__main__":
-    remove_front_matter(INPUT_FILE, OUTPUT_FILE, PAGES_TO_REMOVE)
+    parser = argparse.ArgumentParser(description="Check the page ranges in manuals.json (optionally write trimmed copies)")
+    parser.add_argument("files", nargs="*", help="Manuals to check (default: every trimmed manual in the config)")
+    parser.add_argument("--dir", default=MANUALS_DIRECTORY)
+    parser.add_argument("--config", default=MANUALS_CONFIG)
+    parser.add_argument("--write", action="store_true", help="Also write <name>_clean.pdf copies")
+    args = parser.parse_args()
+
+    ranges = page_ranges(load_manuals_config(args.config))
+    for filename in args.files or sorted(ranges):
+        input_path = os.path.join(args.dir, filename)
+        pages = ranges.get(filename)
+        if not os.path.exists(input_path):
+            print(f"[MISSING] {filename}")
+            continue
+        try:
+            total_pages = check_trim(input_path, pages)
+            kept = f"pages {pages[0]}-{pages[1] or total_pages}" if pages else "all pages"
+            print(f"[OK] {filename}: {total_pages} pages, indexing {kept}")
+            if args.write and pages:
+                output_path = os.path.splitext(input_path)[0] + "_clean.pdf"
+                print(f" -> Wrote {write_trimmed(input_path, output_path, pages)} pages to {output_path}")
+        except Exception as e:
+            print(f"[ERROR] {filename}: {e}")
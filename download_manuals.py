@@ -1,67 +1,179 @@
 import os
+import json
+import hashlib
+import argparse
+import concurrent.futures
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from clean_pdf import MANUALS_CONFIG, load_manuals_config, page_range, check_trim
 
 # --- CONFIGURATION ---
 DOWNLOAD_DIR = "/home/richm/Documents/AG_Project2/audit-viewer/manuals"
+DOWNLOAD_WORKERS = 4          # Documents fetched at once (also the connection pool size)
+CHUNK_SIZE = 64 * 1024        # Bytes per read/write (what a dropped connection can lose)
+RETRIES = 3                   # Attempts per document; each retry resumes from the partial file
+TIMEOUT = (10, 60)            # Connect / read timeout in seconds
 
-# The "Gold Standard" Public Domain Documents
-DOCUMENTS = {
-    "EU_GMP_Annex1_2022_Sterile_Products.pdf": 
-        "https://health.ec.europa.eu/system/files/2022-08/20220825_gmp-an1_en_0.pdf",
-    
-    "FDA_Guidance_Aseptic_Processing_2004.pdf": 
-        "https://www.fda.gov/media/71026/download",
-    
-    "WHO_TRS961_Annex6_Sterile_GMP.pdf": 
-        "https://www.who.int/docs/default-source/medicines/norms-and-standards/guidelines/production/trs961-annex6-gmp-sterile-pharmaceutical-products.pdf"
+# Government sites sometimes block python-requests, so we mimic a browser
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
-def download_file(url, filename):
+class ChecksumError(Exception):
+    pass
+
+def make_session(pool_size=DOWNLOAD_WORKERS):
+    """Shared session whose per-host connection pool is bounded to pool_size"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_length_from_range(response):
+    """Total size from a 416 response's "Content-Range: bytes */N" header, or None"""
+    value = response.headers.get("Content-Range", "")
+    if value.startswith("bytes */") and value[len("bytes */"):].isdigit():
+        return int(value[len("bytes */"):])
+    return None
+
+def fetch(session, url, filepath, sha256=None, retries=RETRIES):
+    """Downloads url to filepath via filepath + ".part", resuming the partial file with a Range request.
+
+    A server that ignores Range (200 instead of 206) restarts the file, as
+    does a 416 whose "bytes */N" size differs from the partial's. 5xx
+    responses and dropped connections are retried.
+    The completed file is checked against sha256 (when given) before it is
+    renamed into place, so filepath only ever holds a whole, verified
+    download. Returns the file's SHA-256.
     """
-    Downloads a file with a browser-like User-Agent header to avoid 403 Forbidden errors.
+    part_path = filepath + ".part"
+    for attempt in range(1, retries + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 416:
+                    # Range starts past the end: complete only if the partial is exactly the file's size
+                    if offset and content_length_from_range(response) == offset:
+                        break
+                    print(f" -> {os.path.basename(filepath)}: partial file does not match the server's; restarting")
+                    os.remove(part_path)
+                    continue
+                response.raise_for_status()  # Raise error if download fails (404, 403, etc.)
+                resumed = response.status_code == 206
+                if resumed and not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                    raise ValueError(f"Unexpected Content-Range for {url}: {response.headers.get('Content-Range')}")
+                with open(part_path, 'ab' if resumed else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+            break
+        except requests.HTTPError as e:
+            # Server-side errors are often transient; client errors (404, 403) are not
+            if e.response is None or e.response.status_code < 500 or attempt == retries:
+                raise
+            print(f" -> {os.path.basename(filepath)}: {e}; resuming (attempt {attempt + 1}/{retries})")
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == retries:
+                raise
+            print(f" -> {os.path.basename(filepath)}: {e}; resuming (attempt {attempt + 1}/{retries})")
+    else:
+        raise IOError(f"Could not download {url} after {retries} attempts")
+
+    digest = file_sha256(part_path)
+    if sha256 and digest != sha256.lower():
+        # A corrupt partial cannot be resumed; start clean next time
+        os.remove(part_path)
+        raise ChecksumError(f"SHA-256 mismatch for {os.path.basename(filepath)}: expected {sha256}, got {digest}")
+    os.replace(part_path, filepath)
+    return digest
+
+def acquire(session, filename, entry, download_dir=DOWNLOAD_DIR):
+    """Fetch-and-preprocess one manual: download/verify it, then check its page range.
+
+    Returns (filename, status, detail).
     """
-    # Create the full path
-    filepath = os.path.join(DOWNLOAD_DIR, filename)
-    
-    # Check if we already have it
+    filepath = os.path.join(download_dir, filename)
+    expected = entry.get("sha256")
     if os.path.exists(filepath):
-        print(f"[SKIP] {filename} already exists.")
-        return
-
-    print(f"[DOWNLOADING] {filename}...")
-    
-    try:
-        # Government sites sometimes block python-requests, so we mimic a browser
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        response = requests.get(url, headers=headers, stream=True)
-        response.raise_for_status() # Raise error if download fails (404, 403, etc.)
-
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                
-        print(f" -> Success! Saved to {filepath}")
-
-    except Exception as e:
-        print(f" -> Error downloading {filename}: {e}")
+        status = "SKIP"
+        digest = file_sha256(filepath) if expected else None
+        if expected and digest != expected.lower():
+            raise ChecksumError(f"{filename} exists but its SHA-256 is {digest}, expected {expected}")
+    elif entry.get("url"):
+        status = "DOWNLOADED"
+        digest = fetch(session, entry["url"], filepath, expected)
+    else:
+        return filename, "MISSING", "no URL; add the file to the manuals folder by hand"
+
+    # Trimming is applied while ingesting; here only check the range fits the document
+    pages = page_range(entry)
+    total_pages = check_trim(filepath, pages)
+    kept = f"indexing pages {pages[0]}-{pages[1] or total_pages}" if pages else "indexing all pages"
+    return filename, status, f"{total_pages} pages, {kept}" + (f", sha256 {digest}" if digest else "")
+
+def acquire_all(documents, download_dir=DOWNLOAD_DIR, workers=DOWNLOAD_WORKERS):
+    """Fetches documents ({filename: entry}) concurrently; yields (filename, status, detail) as each finishes"""
+    os.makedirs(download_dir, exist_ok=True)
+    session = make_session(workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(acquire, session, filename, entry, download_dir): filename
+                   for filename, entry in documents.items()}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield futures[future], "ERROR", str(e)
+
+def pin_checksums(config_path, documents, download_dir=DOWNLOAD_DIR):
+    """Records the SHA-256 of downloaded manuals that have none in the config yet"""
+    config = load_manuals_config(config_path)
+    pinned = 0
+    for filename, entry in config.items():
+        filepath = os.path.join(download_dir, filename)
+        if filename in documents and not entry.get("sha256") and os.path.exists(filepath):
+            entry["sha256"] = file_sha256(filepath)
+            pinned += 1
+    with open(config_path, 'w') as f:
+        json.dump(config, f, indent=4)
+        f.write("\n")
+    return pinned
 
 def main():
-    # 1. Create the directory if it doesn't exist
-    if not os.path.exists(DOWNLOAD_DIR):
-        os.makedirs(DOWNLOAD_DIR)
-        print(f"Created directory: {DOWNLOAD_DIR}")
-
-    # 2. Loop through the list and download
-    print(f"Starting download of {len(DOCUMENTS)} regulatory documents...\n")
-    
-    for filename, url in DOCUMENTS.items():
-        download_file(url, filename)
-
-    print("\nAll downloads complete.")
+    parser = argparse.ArgumentParser(description="Fetch the regulatory manuals listed in manuals.json")
+    parser.add_argument("files", nargs="*", help="Only these manuals (default: all)")
+    parser.add_argument("--config", default=MANUALS_CONFIG)
+    parser.add_argument("--dest", default=DOWNLOAD_DIR)
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument("--pin", action="store_true", help="Write the SHA-256 of new downloads into the config")
+    args = parser.parse_args()
+
+    documents = load_manuals_config(args.config)
+    if args.files:
+        documents = {filename: documents[filename] for filename in args.files}
+
+    print(f"Starting download of {len(documents)} regulatory documents ({args.workers} at a time)...\n")
+    failed = 0
+    for filename, status, detail in acquire_all(documents, args.dest, args.workers):
+        failed += status == "ERROR"
+        print(f"[{status}] {filename}: {detail}")
+
+    if args.pin:
+        print(f"\nPinned {pin_checksums(args.config, documents, args.dest)} checksums in {args.config}")
+    print(f"\nAll downloads complete ({failed} failed).")
     print("Next Step: Run your 'ingest_manuals.py' script to load these into the vector database.")
+    if failed:
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,169 @@
+import os
+import array
+import sqlite3
+import hashlib
+import threading
+import time
+import concurrent.futures
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache", "embeddings.sqlite3")
+BATCH_SIZE = 32          # Texts per call to the underlying embedder
+CONCURRENCY = 2          # Embedder calls in flight at once
+MAX_ENTRIES = 200_000    # Least-recently-used vectors are evicted beyond this
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def as_float32(vector):
+    # Fresh vectors get the same precision as cached ones, so hits and misses agree
+    return array.array("f", vector).tolist()
+
+class EmbeddingCache(object):
+    """Persistent (model, kind, text hash) -> vector store with LRU eviction.
+
+    Vectors are stored as float32 blobs in SQLite. `kind` separates document
+    and query embeddings, which some models compute differently.
+    """
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT, kind TEXT, key TEXT, vector BLOB, last_used REAL,"
+            " PRIMARY KEY (model, kind, key))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+    def get_many(self, model, kind, keys):
+        """Returns {key: vector} for the keys already cached"""
+        found = {}
+        now = time.time()
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND kind = ? AND key IN ({placeholders})",
+                    [model, kind] + chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array.array("f", blob).tolist()
+            if found:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND kind = ? AND key = ?",
+                    [(now, model, kind, key) for key in found]
+                )
+                self.conn.commit()
+        return found
+
+    def put_many(self, model, kind, items):
+        """Stores (key, vector) pairs, then evicts the least recently used beyond max_entries"""
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, kind, key, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(model, kind, key, array.array("f", vector).tobytes(), now) for key, vector in items]
+            )
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(object):
+    """Drop-in embedding function (embed_documents / embed_query) with batching and a disk cache.
+
+    Cache misses are de-duplicated, split into `batch_size` groups and sent to
+    the wrapped embedder with up to `concurrency` calls in flight. Hits never
+    touch the embedding server.
+    """
+    def __init__(self, embedder, model, cache=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+        self.embedder = embedder
+        self.model = model
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.hits = 0
+        self.misses = 0
+
+    def _embed_misses(self, texts):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.concurrency <= 1 or len(batches) == 1:
+            return [vector for batch in batches for vector in self.embedder.embed_documents(batch)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            # map keeps batch order, so vectors line up with texts
+            return [vector for vectors in pool.map(self.embedder.embed_documents, batches) for vector in vectors]
+
+    def _get_or_embed(self, kind, texts):
+        """Vectors for texts: one cache lookup, then the de-duplicated misses embedded in batches"""
+        keys = [text_key(text) for text in texts]
+        vectors = self.cache.get_many(self.model, kind, list(set(keys)))
+        self.hits += sum(1 for key in keys if key in vectors)
+        self.misses += sum(1 for key in keys if key not in vectors)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if missing:
+            new_vectors = [as_float32(v) for v in self._embed_misses(list(missing.values()))]
+            new_items = list(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model, kind, new_items)
+            vectors.update(new_items)
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._get_or_embed("doc", texts)
+
+    def embed_query(self, text):
+        key = text_key(text)
+        cached = self.cache.get_many(self.model, "query", [key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = as_float32(self.embedder.embed_query(text))
+        self.cache.put_many(self.model, "query", [(key, vector)])
+        return vector
+
+    def embed_queries(self, texts):
+        """embed_query for many texts in batches.
+
+        OllamaEmbeddings embeds a query exactly as a one-text document, so
+        the misses go through embed_documents.
+        """
+        return self._get_or_embed("query", texts)
+
+class HashEmbeddings(object):
+    """Deterministic local stub embedder for tests and benchmarks (no Ollama needed)"""
+    def __init__(self, dimensions=64):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        while len(digest) < self.dimensions:
+            digest += hashlib.sha256(digest).digest()
+        return [(b - 127.5) / 127.5 for b in digest[:self.dimensions]]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._vector(text)
@@ -0,0 +1,87 @@
+import os
+import json
+import math
+
+# --- CONFIGURATION ---
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "equipment_rules.json")
+ANY_CATEGORY = "*"  # Rules under this key apply to every category
+
+# Numeric checks give the failing condition on the parsed cell value `v` ('-' or blank parse as 0).
+# Written as the failure (v <= 0, not "not v > 0") so a 'nan' cell passes, as the original checks did
+NUMERIC_CHECKS = {
+    "positive": lambda rule: "v <= 0",
+    "min": lambda rule: f"v < {float(rule['value'])!r}",
+    "max": lambda rule: f"v > {float(rule['value'])!r}",
+    "range": lambda rule: f"v < {float(rule['value'][0])!r} or v > {float(rule['value'][1])!r}",
+}
+
+# Text checks test the raw cell string `s` ('' when missing)
+TEXT_CHECKS = {
+    "required": lambda rule: "s",
+    "contains": lambda rule: f"s and {rule['value']!r} in s",
+    "one_of": lambda rule: f"s in {frozenset(rule['value'])!r}",
+}
+
+def load_rules(path=RULES_FILE):
+    """Reads the declarative rule table: {category: [rule, ...]}"""
+    with open(path, 'r') as f:
+        rules = json.load(f)
+    # json.load accepts NaN/Infinity, which would render as undefined names in the compiled checks
+    for category, category_rules in rules.items():
+        for rule in category_rules:
+            if rule.get("check") not in NUMERIC_CHECKS or "value" not in rule:
+                continue
+            values = rule["value"] if isinstance(rule["value"], list) else [rule["value"]]
+            if any(isinstance(v, float) and not math.isfinite(v) for v in values):
+                raise ValueError(f"Non-finite threshold {rule['value']!r} in '{rule['check']}' rule"
+                                 f" for column '{rule.get('column')}' in category '{category}'")
+    return rules
+
+def _category_source(rules):
+    # Group numeric tests by column so each cell is parsed once per row
+    numeric = {}
+    text = []
+    for rule in rules:
+        kind = rule["check"]
+        if kind in NUMERIC_CHECKS:
+            numeric.setdefault(rule["column"], []).append((NUMERIC_CHECKS[kind](rule), rule["issue"]))
+        elif kind in TEXT_CHECKS:
+            text.append((rule["column"], TEXT_CHECKS[kind](rule), rule["issue"]))
+        else:
+            raise ValueError(f"Unknown check '{kind}' in rule for column '{rule['column']}'")
+
+    lines = ["def check(row):", "    issues = []", "    get = row.get"]
+    if numeric:
+        lines.append("    try:")
+        for column, tests in numeric.items():
+            lines.append(f"        raw = get({column!r}, '0')")
+            lines.append("        v = float(raw) if raw and raw != '-' else 0")
+            for expr, issue in tests:
+                lines.append(f"        if {expr}: issues.append({issue!r})")
+        lines.append("    except ValueError:")
+        lines.append("        issues.append('Invalid numeric data')")
+    for column, expr, issue in text:
+        lines.append(f"    s = get({column!r}) or ''")
+        lines.append(f"    if not ({expr}): issues.append({issue!r})")
+    lines.append("    return issues")
+    return "\n".join(lines)
+
+def _compile_category(rules):
+    namespace = {}
+    exec(compile(_category_source(rules), "<equipment_rules>", "exec"), namespace)
+    return namespace["check"]
+
+def compile_rules(rules):
+    """Compiles the rule table into one check function per category.
+
+    Each category's rules are rendered to a straight-line function with the
+    column names and thresholds inlined. Category-specific rules run before
+    the ANY_CATEGORY rules; unlisted categories get the ANY_CATEGORY check.
+    """
+    common = rules.get(ANY_CATEGORY, [])
+    checks = {
+        category: _compile_category(list(category_rules) + list(common))
+        for category, category_rules in rules.items() if category != ANY_CATEGORY
+    }
+    default = _compile_category(common)
+    return checks, default
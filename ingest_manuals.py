@@ -1,98 +1,382 @@
 import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import itertools
+import collections
 import warnings
+import concurrent.futures
 
 # Silence LangChain deprecation warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", message=".*Chroma.*")
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import OllamaEmbeddings
-from langchain_community.vectorstores import Chroma
+# LangChain modules are imported inside the functions that use them, so an
+# up-to-date index is detected without loading them (and pool workers only
+# load the PDF loader and splitter)
+from embedding_cache import CachedEmbeddings
+from query_cache import write_index_generation
+from keyword_index import KeywordIndex
+from quantized_index import QuantizedIndex
+from clean_pdf import MANUALS_CONFIG, load_manuals_config, page_ranges
 
 # --- CONFIGURATION ---
 SOURCE_DIRECTORY = "/home/richm/Documents/AG_Project2/audit-viewer/manuals"  # Put your PDF files here
 DB_PATH = "./local_db"          # Where the vector DB will be saved
 EMBEDDING_MODEL = "nomic-embed-text" # Must be pulled in Ollama first
+MANIFEST_PATH = os.path.join(DB_PATH, "ingest_manifest.json")  # File hash -> chunk IDs
+PARSE_WORKERS = os.cpu_count() or 1  # Processes parsing/splitting PDFs in parallel
+PAGES_PER_TASK = 16                  # Pages parsed per pool task; bounds the text held per worker
+EMBED_BATCH_SIZE = 64                # Chunks sent to the embedder/DB per call
+PROGRESS_PREFIX = "PROGRESS "        # --progress lines: PROGRESS {"stage": ..., "done": ...}
 
-def ingest_pdfs():
-    # 1. Check if directory exists
-    if not os.path.exists(SOURCE_DIRECTORY):
-        print(f"Error: Directory '{SOURCE_DIRECTORY}' not found.")
-        return
-
-    # 1b. Clear existing database to prevent duplicates
-    if os.path.exists(DB_PATH):
-        print(f"Clearing existing database at {DB_PATH}...")
-        import shutil
-        # We remove the contents but keep the directory, or just remove and recreate
-        shutil.rmtree(DB_PATH)
-        os.makedirs(DB_PATH)
-
-    # 2. Iterate through all PDFs in the directory
+def list_source_pdfs():
+    """Returns the PDFs to index, preferring *_clean.pdf over its original"""
     all_files = os.listdir(SOURCE_DIRECTORY)
-    pdf_files = [f for f in all_files if f.endswith(".pdf")]
-    
+    pdf_files = sorted(f for f in all_files if f.endswith(".pdf"))
+
     # Identify files to skip (original files that have a _clean version)
     clean_versions = [f for f in pdf_files if f.endswith("_clean.pdf")]
-    originals_with_clean = [f.replace("_clean.pdf", ".pdf") for f in clean_versions]
-    
-    documents = []
+    originals_with_clean = set(f.replace("_clean.pdf", ".pdf") for f in clean_versions)
+
+    selected = []
     for filename in pdf_files:
         # Skip if there's a cleaner version available
         if filename in originals_with_clean:
             print(f"Skipping original (clean version found): {filename}")
             continue
-            
-        file_path = os.path.join(SOURCE_DIRECTORY, filename)
-        print(f"Loading: {filename}...")
-        
-        try:
-            # Load the PDF
-            loader = PyPDFLoader(file_path)
-            docs = loader.load()
-            
-            # Add metadata (Filename and relative path)
-            for doc in docs:
-                doc.metadata["source_manual"] = filename
-                # Page numbers should be 1-indexed for user readability
-                if "page" in doc.metadata:
-                    doc.metadata["page"] = int(doc.metadata["page"]) + 1
-                else:
-                    doc.metadata["page"] = "N/A"
-            
-            documents.extend(docs)
-        except Exception as e:
-            print(f"Error loading {filename}: {e}")
-
-    if not documents:
-        print("No PDFs found to ingest.")
-        return
+        selected.append(filename)
+    return selected
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_id_prefix(filename, sha256):
+    """Chunk ID prefix from file name and content hash.
+
+    Re-runs address the same chunks, while byte-identical PDFs stored under
+    two names never share (and overwrite or delete) each other's chunks.
+    """
+    return hashlib.sha256(f"{filename}\0{sha256}".encode("utf-8")).hexdigest()[:16]
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    # Write-then-rename so an interrupted run never leaves a half-written manifest
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def iter_pdf_pages(filename, page_range=None):
+    """Yields the PDF's pages as Documents, limited to the page range from manuals.json (if any).
+
+    Only pages inside the range are text-extracted; the others are never read.
+    """
+    from pypdf import PdfReader
+    from langchain_core.documents import Document
+
+    file_path = os.path.join(SOURCE_DIRECTORY, filename)
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    first, last = page_range or (1, None)
+    # Page numbers are 1-indexed for user readability
+    for number in range(first, min(last or total_pages, total_pages) + 1):
+        page_index = number - 1
+        yield Document(
+            page_content=reader.pages[page_index].extract_text(extraction_mode="plain").strip(),
+            metadata={
+                "source": file_path,
+                "source_manual": filename,
+                "total_pages": total_pages,
+                "page": number,
+                "page_label": reader.page_labels[page_index]
+            }
+        )
+
+def make_text_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-    # 3. Split the text into "Chunks"
     #    Chunk Size 1000: Good for capturing a full regulation clause.
     #    Overlap 200: Vital so context isn't lost if a sentence is cut in half.
-    print(f"Splitting {len(documents)} pages into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
+    return RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
         separators=["\n\n", "\n", "(?<=\. )", " ", ""]
     )
-    splits = text_splitter.split_documents(documents)
-    print(f"Created {len(splits)} chunks.")
-
-    # 4. Create/Update the Vector Database
-    print("Embedding data and saving to ChromaDB (this may take a moment)...")
-    embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
-    
-    vectorstore = Chroma.from_documents(
-        documents=splits, 
-        embedding=embeddings, 
-        persist_directory=DB_PATH
-    )
-    
+
+def parse_and_split(filename, page_range=None):
+    """Pool worker: parses one page range of a PDF and splits each page as it is read.
+
+    Returns (filename, chunks, pages, parse_seconds, split_seconds).
+    """
+    text_splitter = make_text_splitter()
+    chunks = []
+    pages = 0
+    parse_seconds = split_seconds = 0.0
+    page_iter = iter_pdf_pages(filename, page_range)
+    while True:
+        start = time.perf_counter()
+        doc = next(page_iter, None)
+        parse_seconds += time.perf_counter() - start
+        if doc is None:
+            break
+        pages += 1
+        start = time.perf_counter()
+        chunks.extend(text_splitter.split_documents([doc]))
+        split_seconds += time.perf_counter() - start
+    return filename, chunks, pages, parse_seconds, split_seconds
+
+def page_batches(filename, page_range=None, pages_per_task=PAGES_PER_TASK):
+    """Splits a PDF's pages (or its manuals.json range) into (first, last) tasks of at most pages_per_task.
+
+    An empty range still gets one (empty) task, so the manual is recorded as indexed.
+    """
+    from pypdf import PdfReader
+
+    # Only the page tree is read here; text extraction happens in the pool
+    total_pages = len(PdfReader(os.path.join(SOURCE_DIRECTORY, filename)).pages)
+    first, last = page_range or (1, None)
+    last = min(last or total_pages, total_pages)
+    return [(start, min(start + pages_per_task - 1, last))
+            for start in range(first, last + 1, pages_per_task)] or [(first, first - 1)]
+
+def iter_parsed_pdfs(filenames, workers=PARSE_WORKERS, ranges=None):
+    """Yields (filename, chunks, pages, parse_seconds, split_seconds, last) per page batch, in page order.
+
+    Each pool task covers PAGES_PER_TASK pages and at most 2 * workers tasks
+    are in flight, so memory is bounded by page batches, not by the size of
+    the PDFs. `last` marks a file's final batch. A file that fails to parse
+    yields (filename, None, 0, 0.0, 0.0, True) once; its remaining batches
+    are skipped.
+    """
+    ranges = ranges or {}
+
+    def tasks():
+        for filename in filenames:
+            try:
+                batches = page_batches(filename, ranges.get(filename))
+            except Exception as e:
+                print(f"Error loading {filename}: {e}")
+                yield filename, None, True
+                continue
+            for index, page_range in enumerate(batches, 1):
+                yield filename, page_range, index == len(batches)
+
+    def submit(filename, page_range, last):
+        future = pool.submit(parse_and_split, filename, page_range) if page_range is not None else None
+        in_flight.append((future, filename, last))
+
+    failed = set()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = tasks()
+        # Submission order, so each file's batches come back in page order (stable chunk numbering)
+        in_flight = collections.deque()
+        for task in itertools.islice(pending, 2 * workers):
+            submit(*task)
+        while in_flight:
+            future, filename, last = in_flight.popleft()
+            for task in itertools.islice(pending, 1):
+                submit(*task)
+            if filename in failed:
+                future.cancel()
+                continue
+            if future is None:
+                # page_batches could not open it (already reported)
+                yield filename, None, 0, 0.0, 0.0, True
+                continue
+            try:
+                yield future.result() + (last,)
+            except Exception as e:
+                print(f"Error loading {filename}: {e}")
+                failed.add(filename)
+                yield filename, None, 0, 0.0, 0.0, True
+
+def make_embeddings():
+    """Default embedding function: batched Ollama embeddings behind the disk cache"""
+    from langchain_community.embeddings import OllamaEmbeddings
+
+    # Cached: unchanged chunk text from a re-added/edited manual is not re-embedded
+    return CachedEmbeddings(OllamaEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
+
+class TimedEmbeddings(object):
+    """Wraps an embedder so embed time can be split out of vectorstore writes"""
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.seconds = 0.0
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        try:
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+def ingest_pdfs(rebuild=False, embeddings=None, progress=None):
+    """Brings the vector DB in line with SOURCE_DIRECTORY.
+
+    Only new or changed PDFs (by SHA-256) are parsed and embedded; chunks of
+    removed or changed PDFs are deleted by ID. A DB without a manifest (or
+    rebuild=True) is wiped and rebuilt once so old chunks are not duplicated.
+    `embeddings` overrides make_embeddings() (e.g. a stub for benchmarks).
+    `progress`, if given, is called as progress(stage=..., done=..., total=...)
+    after each parsed page batch and each embedded batch.
+    Returns the stage timings, or None when nothing was indexed.
+    """
+    # 1. Check if directory exists
+    if not os.path.exists(SOURCE_DIRECTORY):
+        print(f"Error: Directory '{SOURCE_DIRECTORY}' not found.")
+        return
+
+    manifest = load_manifest() if not rebuild else None
+    if manifest is not None and not KeywordIndex.exists(DB_PATH):
+        print("Keyword index missing; rebuilding so it matches the vector store...")
+        manifest = None
+    if manifest is None:
+        # 1b. Clear existing database to prevent duplicates
+        if os.path.exists(DB_PATH):
+            print(f"Clearing existing database at {DB_PATH}...")
+            shutil.rmtree(DB_PATH)
+        manifest = {}
+    os.makedirs(DB_PATH, exist_ok=True)
+
+    # 2. Work out what changed since the last run
+    pdf_files = list_source_pdfs()
+    hashes = {filename: file_sha256(os.path.join(SOURCE_DIRECTORY, filename)) for filename in pdf_files}
+    # Page ranges from manuals.json; editing a range re-indexes that manual
+    ranges = {filename: list(pages) for filename, pages in page_ranges(load_manuals_config(MANUALS_CONFIG)).items()}
+
+    removed = [f for f in manifest if f not in hashes]
+    changed = [f for f in pdf_files if f in manifest
+               and (manifest[f]["sha256"] != hashes[f] or manifest[f].get("pages") != ranges.get(f))]
+    added = [f for f in pdf_files if f not in manifest]
+    unchanged = len(pdf_files) - len(changed) - len(added)
+    print(f"Manuals: {len(added)} new, {len(changed)} changed, {len(removed)} removed, {unchanged} unchanged.")
+
+    backfill = not QuantizedIndex.exists(DB_PATH)
+    if not (removed or changed or added or backfill):
+        print(f"Vector database at {DB_PATH} is up to date.")
+        return
+
+    from langchain_community.vectorstores import Chroma
+
+    embeddings = TimedEmbeddings(embeddings or make_embeddings())
+    vectorstore = Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
+    # BM25 index over the same chunk IDs, used for hybrid retrieval in query_manuals.py
+    keyword_index = KeywordIndex(DB_PATH)
+    # int8 memory-mapped copy of the vectors for query_manuals.VECTOR_BACKEND = "quantized"
+    quantized_index = QuantizedIndex(DB_PATH)
+    if backfill and manifest:
+        # Store indexed before the quantized index existed: copy its vectors across
+        print("Building quantized index from the stored vectors...")
+        copy_vectors(vectorstore, quantized_index, [cid for entry in manifest.values() for cid in entry["chunk_ids"]])
+
+    # 3. Drop chunks for removed/changed manuals
+    for filename in removed + changed:
+        chunk_ids = manifest[filename]["chunk_ids"]
+        if chunk_ids:
+            print(f"Removing {len(chunk_ids)} chunks for: {filename}")
+            vectorstore.delete(ids=chunk_ids)
+            keyword_index.delete_chunks(chunk_ids)
+            quantized_index.delete(chunk_ids)
+        del manifest[filename]
+        save_manifest(manifest)
+
+    # 4. Parse/split in a process pool; embed and write in bounded batches as each PDF arrives
+    timings = {"parse": 0.0, "split": 0.0, "embed": 0.0, "write": 0.0}
+    total_pages = total_chunks = 0
+    wall_start = time.perf_counter()
+    to_index = changed + added
+    embedded = 0
+    parsed = iter_parsed_pdfs(to_index, ranges=ranges)
+    in_progress = {}  # filename -> pages and chunk IDs written so far
+    files_done = 0
+    for filename, splits, pages, parse_seconds, split_seconds, last in parsed:
+        indexed = in_progress.setdefault(filename, {"pages": 0, "chunk_ids": []})
+        if splits is None:
+            # The manual failed to parse: drop any batches already written, so it is retried whole next run
+            del in_progress[filename]
+            if indexed["chunk_ids"]:
+                vectorstore.delete(ids=indexed["chunk_ids"])
+                keyword_index.delete_chunks(indexed["chunk_ids"])
+                quantized_index.delete(indexed["chunk_ids"])
+            files_done += 1
+            if progress:
+                progress(stage="pages_parsed", done=total_pages, files_done=files_done, files_total=len(to_index),
+                         file=filename)
+            continue
+
+        timings["parse"] += parse_seconds
+        timings["split"] += split_seconds
+        total_pages += pages
+        total_chunks += len(splits)
+        indexed["pages"] += pages
+        if last:
+            files_done += 1
+        if progress:
+            progress(stage="pages_parsed", done=total_pages, files_done=files_done, files_total=len(to_index),
+                     file=filename)
+
+        # Numbered across the file's batches, so IDs match a whole-file split
+        first_index = len(indexed["chunk_ids"])
+        chunk_ids = [f"{chunk_id_prefix(filename, hashes[filename])}-{i:05d}"
+                     for i in range(first_index, first_index + len(splits))]
+        for start in range(0, len(splits), EMBED_BATCH_SIZE):
+            embed_before = embeddings.seconds
+            batch_start = time.perf_counter()
+            vectorstore.add_documents(splits[start:start + EMBED_BATCH_SIZE], ids=chunk_ids[start:start + EMBED_BATCH_SIZE])
+            keyword_index.add_chunks(chunk_ids[start:start + EMBED_BATCH_SIZE], splits[start:start + EMBED_BATCH_SIZE])
+            copy_vectors(vectorstore, quantized_index, chunk_ids[start:start + EMBED_BATCH_SIZE])
+            embed_seconds = embeddings.seconds - embed_before
+            timings["embed"] += embed_seconds
+            timings["write"] += time.perf_counter() - batch_start - embed_seconds
+            embedded += len(chunk_ids[start:start + EMBED_BATCH_SIZE])
+            if progress:
+                # Total grows as pages are parsed; it is final once files_done == files_total
+                progress(stage="chunks_embedded", done=embedded, total=total_chunks)
+        del splits
+        indexed["chunk_ids"].extend(chunk_ids)
+
+        if last:
+            del in_progress[filename]
+            print(f"Loaded: {filename} ({indexed['pages']} pages, {len(indexed['chunk_ids'])} chunks)")
+            manifest[filename] = {"sha256": hashes[filename], "pages": ranges.get(filename),
+                                  "chunk_ids": indexed["chunk_ids"]}
+            save_manifest(manifest)
+
+    # Parse/split are summed across workers, so they can exceed wall time
+    print(f"Indexed {total_pages} pages into {total_chunks} chunks in {time.perf_counter() - wall_start:.1f}s")
+    print("Stage timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+
+    if quantized_index.compact():
+        print("Compacted quantized index.")
+    # Invalidates cached query results (query_manuals.py)
+    write_index_generation(DB_PATH)
     print(f"Success! Data saved to {DB_PATH}")
+    return dict(timings, pages=total_pages, chunks=total_chunks, wall=time.perf_counter() - wall_start)
 
-if __name__ == "__main__":
-    ingest_pdfs()
+def copy_vectors(vectorstore, quantized_index, chunk_ids):
+    """Copies the stored Chroma vectors for chunk_ids into the quantized index (no re-embedding)"""
+    for start in range(0, len(chunk_ids), EMBED_BATCH_SIZE):
+        stored = vectorstore.get(ids=chunk_ids[start:start + EMBED_BATCH_SIZE], include=["embeddings"])
+        quantized_index.add(stored["ids"], stored["embeddings"])
+
+def print_progress(**fields):
+    # --progress: machine-readable lines for the job queue (audit_worker.py); plain prints stay human-readable
+    print(PROGRESS_PREFIX + json.dumps(fields), flush=True)
 
+if __name__ == "__main__":
+    ingest_pdfs(rebuild="--rebuild" in sys.argv[1:], progress=print_progress if "--progress" in sys.argv[1:] else None)
@@ -0,0 +1,212 @@
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import collections
+
+# --- CONFIGURATION ---
+MAX_WORKERS = 2      # Jobs running at once
+MAX_PENDING = 20     # Queued + running jobs before submit() refuses new work
+EVENT_HISTORY = 500  # Progress events kept in memory per job for polling
+FINISHED_RETENTION = 600  # Seconds a finished job's result and events stay in memory
+FINISHED_JOBS = 100       # Finished jobs kept in memory at most; older ones are read from the table
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT,
+    params TEXT,
+    coalesce_key TEXT,
+    status TEXT,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created REAL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created);
+"""
+ACTIVE = ("queued", "running")
+
+class JobQueueFull(RuntimeError):
+    pass
+
+class JobQueue(object):
+    """Bounded background job runner with a persistent status table.
+
+    Jobs run on `workers` threads in submission order. Each job's handler is
+    called as handler(params, progress) and reports progress with
+    progress(stage=..., done=..., total=...); every status change and
+    progress call becomes an event (numbered per job) that callers can poll
+    with events() or receive through `on_event`. Jobs sharing a
+    coalesce_key never run concurrently, and a submit that matches a job
+    still waiting in the queue returns that job instead of adding another.
+    Finished jobs leave memory after FINISHED_RETENTION seconds or beyond
+    FINISHED_JOBS; status() then reads them from the table.
+    """
+    def __init__(self, db_path, handlers, workers=MAX_WORKERS, max_pending=MAX_PENDING, on_event=None):
+        self.handlers = handlers
+        self.max_pending = max_pending
+        self.on_event = on_event
+        self.cond = threading.Condition()
+        self.queue = collections.deque()
+        self.jobs = {}
+        self.events_by_job = {}
+        self.finished = collections.deque()  # Finished job IDs, oldest first
+        self.running_keys = set()
+        self.db_lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        # Jobs from a previous worker process cannot resume
+        self.conn.execute(
+            "UPDATE jobs SET status = 'interrupted', error = 'Worker restarted', finished = ? WHERE status IN (?, ?)",
+            (time.time(),) + ACTIVE
+        )
+        self.conn.commit()
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _save(self, job, *columns):
+        values = [json.dumps(job[c]) if c in ("params", "progress", "result") else job[c] for c in columns]
+        with self.db_lock:
+            if columns == tuple(job):
+                self.conn.execute(f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                  values)
+            else:
+                self.conn.execute(f"UPDATE jobs SET {', '.join(c + ' = ?' for c in columns)} WHERE job_id = ?",
+                                  values + [job["job_id"]])
+            self.conn.commit()
+
+    def _emit(self, job, event_type, **fields):
+        # Caller holds self.cond
+        history = self.events_by_job.setdefault(job["job_id"], collections.deque(maxlen=EVENT_HISTORY))
+        seq = history[-1]["seq"] + 1 if history else 1
+        event = dict(fields, job_id=job["job_id"], kind=job["kind"], seq=seq, type=event_type, status=job["status"],
+                     time=time.time())
+        history.append(event)
+        if self.on_event:
+            self.on_event(event)
+
+    def submit(self, kind, params=None, coalesce_key=None):
+        """Queues a job; returns (job status dict, coalesced)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self.cond:
+            self._prune()
+            if coalesce_key:
+                for job in self.queue:
+                    if job["coalesce_key"] == coalesce_key:
+                        return self._public(job), True
+            active = len(self.queue) + sum(1 for job in self.jobs.values() if job["status"] == "running")
+            if active >= self.max_pending:
+                raise JobQueueFull(f"Job queue is full ({active} pending); try again later")
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "kind": kind,
+                "params": params or {},
+                "coalesce_key": coalesce_key,
+                "status": "queued",
+                "progress": {},
+                "result": None,
+                "error": None,
+                "created": time.time(),
+                "started": None,
+                "finished": None
+            }
+            self._save(job, *job)
+            self.jobs[job["job_id"]] = job
+            self.queue.append(job)
+            self._emit(job, "status")
+            self.cond.notify()
+            return self._public(job), False
+
+    def _next_job(self):
+        # Caller holds self.cond: first queued job whose coalesce key is not already running
+        for job in self.queue:
+            if not job["coalesce_key"] or job["coalesce_key"] not in self.running_keys:
+                self.queue.remove(job)
+                return job
+        return None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None:
+                    self.cond.wait()
+                    job = self._next_job()
+                job["status"] = "running"
+                job["started"] = time.time()
+                if job["coalesce_key"]:
+                    self.running_keys.add(job["coalesce_key"])
+                self._emit(job, "status")
+            self._save(job, "status", "started")
+
+            try:
+                result = self.handlers[job["kind"]](job["params"], lambda **fields: self._progress(job, fields))
+                job.update(status="done", result=result)
+            except Exception as e:
+                job.update(status="failed", error=str(e))
+            job["finished"] = time.time()
+            self._save(job, "status", "progress", "result", "error", "finished")
+
+            with self.cond:
+                self.running_keys.discard(job["coalesce_key"])
+                self._emit(job, "status", error=job["error"])
+                self.finished.append(job["job_id"])
+                self._prune()
+                # A coalesced follow-up may be runnable now
+                self.cond.notify_all()
+
+    def _prune(self):
+        # Caller holds self.cond
+        cutoff = time.time() - FINISHED_RETENTION
+        while self.finished and (len(self.finished) > FINISHED_JOBS
+                                 or self.jobs[self.finished[0]]["finished"] < cutoff):
+            job_id = self.finished.popleft()
+            del self.jobs[job_id]
+            self.events_by_job.pop(job_id, None)
+
+    def _progress(self, job, fields):
+        with self.cond:
+            job["progress"][fields.get("stage", "progress")] = fields
+            self._emit(job, "progress", **fields)
+        self._save(job, "progress")
+
+    def _public(self, job):
+        return {key: job[key] for key in ("job_id", "kind", "status", "progress", "error", "created", "started",
+                                          "finished")}
+
+    def status(self, job_id):
+        """Current state of a job (in memory, else from the table), with its result once done"""
+        with self.cond:
+            job = self.jobs.get(job_id)
+            if job:
+                return dict(self._public(job), result=job["result"])
+        with self.db_lock:
+            cursor = self.conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        for column in ("params", "progress", "result"):
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def events(self, job_id, since=0):
+        """Events with seq > since (in-memory history of this process only)"""
+        with self.cond:
+            return [event for event in self.events_by_job.get(job_id, ()) if event["seq"] > since]
+
+    def list(self, limit=50):
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT job_id, kind, status, error, created, started, finished FROM jobs"
+                " ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        columns = ("job_id", "kind", "status", "error", "created", "started", "finished")
+        return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,143 @@
+import os
+import re
+import math
+import sqlite3
+import threading
+import collections
+
+# --- CONFIGURATION ---
+INDEX_FILE = "keyword_index.sqlite3"  # Lives next to the Chroma store in DB_PATH
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal-rank-fusion damping constant
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class KeywordIndex(object):
+    """Persistent inverted index + BM25 scoring over manual chunks.
+
+    Built by ingest_manuals.py with the same chunk IDs as the Chroma store,
+    so adds/deletes stay in step with the vector index.
+    """
+    def __init__(self, db_path):
+        self.path = os.path.join(db_path, INDEX_FILE)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " chunk_id TEXT PRIMARY KEY, source TEXT, page TEXT, length INTEGER, content TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT, chunk_id TEXT, tf INTEGER, PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings (chunk_id)")
+        self.conn.commit()
+
+    @staticmethod
+    def exists(db_path):
+        return os.path.exists(os.path.join(db_path, INDEX_FILE))
+
+    def add_chunks(self, chunk_ids, docs):
+        """Indexes LangChain Documents under the given chunk IDs"""
+        chunk_rows = []
+        posting_rows = []
+        for chunk_id, doc in zip(chunk_ids, docs):
+            tokens = tokenize(doc.page_content)
+            chunk_rows.append((chunk_id, doc.metadata.get("source_manual", "Unknown Source"),
+                               str(doc.metadata.get("page", "N/A")), len(tokens), doc.page_content))
+            posting_rows.extend((term, chunk_id, tf) for term, tf in collections.Counter(tokens).items())
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)", chunk_rows)
+            self.conn.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", posting_rows)
+            self.conn.commit()
+
+    def delete_chunks(self, chunk_ids):
+        with self.lock:
+            for start in range(0, len(chunk_ids), 500):
+                chunk = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                self.conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", chunk)
+                self.conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", chunk)
+            self.conn.commit()
+
+    def _chunk_rows(self, chunk_ids):
+        placeholders = ",".join("?" * len(chunk_ids))
+        rows = self.conn.execute(
+            f"SELECT chunk_id, source, page, content FROM chunks WHERE chunk_id IN ({placeholders})", chunk_ids
+        ).fetchall()
+        return {row[0]: {"content": row[3], "source": row[1], "page": _page_value(row[2])} for row in rows}
+
+    def get_chunks(self, chunk_ids):
+        """chunk_id -> {content, source, page} for the IDs that are indexed"""
+        chunks = {}
+        with self.lock:
+            for start in range(0, len(chunk_ids), 500):
+                chunks.update(self._chunk_rows(chunk_ids[start:start + 500]))
+        return chunks
+
+    def search(self, query, k=6):
+        """Returns the top-k chunks by BM25 as [(score, {content, source, page})]"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self.lock:
+            total, avg_length = self.conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+            scores = collections.defaultdict(float)
+            for term in terms:
+                postings = self.conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c USING (chunk_id) WHERE p.term = ?",
+                    (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+            rows = self._chunk_rows([chunk_id for chunk_id, _ in top]) if top else {}
+        return [(score, rows[chunk_id]) for chunk_id, score in top if chunk_id in rows]
+
+    def find_phrase(self, phrase):
+        """Exact (case-insensitive) phrase hits as [(source, page)], answered from the index"""
+        terms = tokenize(phrase)
+        if not terms:
+            return []
+        with self.lock:
+            # Intersect postings for every token, then confirm the phrase in the stored text
+            query = " INTERSECT ".join(["SELECT chunk_id FROM postings WHERE term = ?"] * len(set(terms)))
+            candidates = [row[0] for row in self.conn.execute(query, list(set(terms))).fetchall()]
+            hits = set()
+            needle = phrase.lower()
+            for start in range(0, len(candidates), 500):
+                for row in self._chunk_rows(candidates[start:start + 500]).values():
+                    if needle in row["content"].lower():
+                        hits.add((row["source"], row["page"]))
+        # Numeric page order (2 before 10); non-numeric pages ("N/A") last
+        return sorted(hits, key=lambda hit: (hit[0], hit[1] if isinstance(hit[1], int) else float('inf'),
+                                             str(hit[1])))
+
+def _page_value(page):
+    return int(page) if page.isdigit() else page
+
+def fuse_results(vector_results, keyword_results, k=6):
+    """Reciprocal-rank fusion of two ranked lists of {content, source, page} dicts.
+
+    Duplicates (same chunk text) are merged, so a chunk found by both
+    retrievers ranks above one found by either alone.
+    """
+    scores = collections.defaultdict(float)
+    items = {}
+    for ranked in (vector_results, keyword_results):
+        for rank, item in enumerate(ranked):
+            key = item["content"]
+            scores[key] += 1.0 / (RRF_K + rank + 1)
+            items.setdefault(key, item)
+    ordered = sorted(scores, key=lambda key: -scores[key])
+    return [items[key] for key in ordered[:k]]
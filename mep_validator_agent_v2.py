@@ -3,25 +3,32 @@ import os
 import sys
 import json
 import glob
+import codecs
+import hashlib
+import itertools
 from datetime import datetime
 
-# Fallback for thermal comfort if library is missing
-try:
-    from pythermalcomfort.models import pmv_ppd
-except ImportError:
-    def pmv_ppd(tdb, tr, vr, rh, met, clo):
-        # Very simplified mock PMV calculation: optimal range 20-24C
-        pmv = (tdb - 22) / 2
-        return {'pmv': pmv}
+from equipment_rules import RULES_FILE, load_rules, compile_rules
+from audit_store import AuditStore
+from audit_analytics import AuditAnalytics
+from audit_citations import FailureTypes, cite_failures
+from audit_metrics import AuditMetrics, metrics_stage, profiled, process_startup_seconds
+from thermal_comfort import ComfortEvaluator, comfort_label, reported, load_numpy, COMFORT_LIMIT
 
 class LabMEPAgent:
-    def __init__(self, room_data=None):
+    def __init__(self, room_data=None, rules_path=RULES_FILE, comfort_grid=False):
         self.rooms = room_data or []
         self.standards = {
             "ISO_7": {"min_ach": 30, "max_ach": 65, "pressure_pa": 15},
             "ISO_8": {"min_ach": 10, "max_ach": 25, "pressure_pa": 10},
             "BSL_3": {"min_ach": 12, "pressure_pa": -30}
         }
+        self.rules = load_rules(rules_path)
+        self.equipment_checks, self.default_equipment_check = compile_rules(self.rules)
+        # PMV/PPD memoized per (temp, humidity); optional interpolation grid
+        self.comfort = ComfortEvaluator(grid=comfort_grid)
+        # Optional AuditMetrics; run_audit attaches one to time the PMV stage
+        self.metrics = None
 
     def validate_ventilation(self, room):
         """Calculates Air Changes per Hour (ACH) and checks vs Standards"""
@@ -40,39 +47,88 @@ class LabMEPAgent:
 
     def check_thermal_comfort(self, room):
         """Calculates PMV (Predicted Mean Vote) for lab occupants"""
-        res = pmv_ppd(tdb=room['temp'], tr=room['temp'], vr=0.1, rh=room['humidity'], met=1.2, clo=0.7)
-        return "Optimal" if abs(res['pmv']) < 0.5 else "Sub-optimal"
+        return self.thermal_comfort(room)['comfort']
+
+    def thermal_comfort(self, room):
+        """PMV, PPD (%) and the Optimal/Sub-optimal label for one room"""
+        res = self.comfort.evaluate(room['temp'], room['humidity'])
+        res['comfort'] = comfort_label(float('nan') if res['pmv'] is None else res['pmv'])
+        return res
+
+    def validate_rooms_batch(self, columns):
+        """Vectorized ACH + comfort check over a whole room schedule.
+
+        `columns` maps the same keys as a room dict (name, class, area, height,
+        supply_airflow_m3h, temp, humidity) to equal-length arrays. Returns a
+        dict of column arrays; use iter_room_results() to get per-room output
+        identical to validate_ventilation / check_thermal_comfort.
+        """
+        # Imported on first use, so equipment-only runs never load numpy
+        np = load_numpy()
+        if np is None:
+            raise RuntimeError("validate_rooms_batch requires numpy")
+
+        names = np.asarray(columns['name'], dtype=object)
+        classes = np.asarray(columns['class'], dtype=object)
+        area = np.asarray(columns['area'], dtype=float)
+        height = np.asarray(columns['height'], dtype=float)
+        airflow = np.asarray(columns['supply_airflow_m3h'], dtype=float)
+        temp = np.asarray(columns['temp'], dtype=float)
+        humidity = np.asarray(columns['humidity'], dtype=float)
+
+        volume = area * height
+        if np.any(volume == 0):
+            # Same failure mode as the scalar path
+            raise ZeroDivisionError("float division by zero")
+        calc_ach = airflow / volume
+
+        # Resolve the standard for each distinct class once, then broadcast
+        unique_classes, inverse = np.unique(classes.astype(str), return_inverse=True)
+        min_lookup = np.zeros(len(unique_classes))
+        required_lookup = np.empty(len(unique_classes), dtype=object)
+        for i, room_class in enumerate(unique_classes):
+            target = self.standards.get(room_class, {})
+            min_lookup[i] = target.get('min_ach', 0)
+            required_lookup[i] = target.get('min_ach')
+        passed = calc_ach >= min_lookup[inverse]
+
+        with metrics_stage(self.metrics, "comfort", len(temp)):
+            pmv, ppd = self.comfort.evaluate_many(temp, humidity)
+
+        return {
+            "room_name": names,
+            "calculated_ach": calc_ach,
+            "required_min": required_lookup[inverse],
+            "status": np.where(passed, "PASS", "FAIL"),
+            "pmv": pmv,
+            "ppd": ppd,
+            "comfort": np.where(np.abs(pmv) < COMFORT_LIMIT, "Optimal", "Sub-optimal"),
+        }
+
+    @staticmethod
+    def iter_room_results(batch):
+        """Yields (ventilation_report, comfort) per room from a batch result"""
+        for name, ach, required, status, comfort in zip(
+                batch['room_name'].tolist(), batch['calculated_ach'].tolist(),
+                batch['required_min'].tolist(), batch['status'].tolist(),
+                batch['comfort'].tolist()):
+            report = {
+                "room_name": name,
+                "calculated_ach": round(ach, 2),
+                "required_min": required,
+                "status": status
+            }
+            yield report, comfort
 
     def validate_equipment(self, equipment_row):
         """Validates MEP equipment based on schedule data"""
         category = equipment_row.get('Category', '')
         mark = equipment_row.get('Mark', '')
-        status = "PASS"
-        issues = []
 
-        # Example validation rules
-        try:
-            if category == 'Fan':
-                sp_str = equipment_row.get('Static Pressure (in wg)', '0')
-                sp = float(sp_str) if sp_str and sp_str != '-' else 0
-                if sp <= 0:
-                    status = "FAIL"
-                    issues.append("Zero/Missing static pressure")
-            
-            if category == 'Pump':
-                flow_str = equipment_row.get('Flow Rate (GPM)', '0')
-                flow = float(flow_str) if flow_str and flow_str != '-' else 0
-                if flow <= 0:
-                    status = "FAIL"
-                    issues.append("Missing flow rate")
-        except ValueError:
-            status = "FAIL"
-            issues.append("Invalid numeric data")
-
-        power = equipment_row.get('Power (V/PH/Hz)', '')
-        if not power or '/' not in power:
-            status = "FAIL"
-            issues.append("Invalid power format")
+        # Rules come from equipment_rules.json, compiled once per agent
+        check = self.equipment_checks.get(category, self.default_equipment_check)
+        issues = check(equipment_row)
+        status = "FAIL" if issues else "PASS"
 
         return {
             "mark": mark,
@@ -81,73 +137,331 @@ class LabMEPAgent:
             "issues": ", ".join(issues) if issues else "None"
         }
 
+# Bytes read up front to decide the file encoding
+ENCODING_SNIFF_BYTES = 64 * 1024
+# Rooms validated per vectorized batch while streaming
+ROOM_BATCH_SIZE = 10000
+# Result rows buffered before each write to the audit store
+STORE_BATCH_SIZE = 1000
+# Write buffer for each report file
+REPORT_BUFFER_BYTES = 1024 * 1024
+ROOM_COLUMNS = ("name", "ach", "status", "comfort", "pmv", "ppd", "class")
+EQUIPMENT_COLUMNS = ("mark", "category", "status", "issues")
+
+def detect_encoding(file_path, sniff_bytes=ENCODING_SNIFF_BYTES):
+    """Picks the CSV encoding once from a prefix of the file"""
+    with open(file_path, mode='rb') as f:
+        prefix = f.read(sniff_bytes)
+    # Incremental decode so a multi-byte character cut at the prefix boundary is not an error
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        decoder.decode(prefix, final=False)
+    except UnicodeDecodeError:
+        # Fallback to latin-1 (common for older Excel formats or special chars)
+        return 'latin-1'
+    # utf-8-sig covers Excel-exported CSVs with BOM
+    return 'utf-8-sig'
+
+def open_schedule(file_path):
+    # Undecodable bytes past the sniffed prefix are replaced rather than aborting a long run
+    return open(file_path, mode='r', encoding=detect_encoding(file_path), errors='replace', newline='')
+
+def iter_rooms_from_csv(file_path):
+    """Yields parsed room dicts one row at a time"""
+    if not os.path.exists(file_path):
+        return
+    try:
+        with open_schedule(file_path) as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Convert numeric strings to floats/ints
+                try:
+                    processed_row = {
+                        "name": row.get('name', 'Unknown'),
+                        "class": row.get('class', 'ISO_8'),
+                        "area": float(row.get('area', 0)),
+                        "height": float(row.get('height', 0)),
+                        "supply_airflow_m3h": float(row.get('supply_airflow_m3h', 0)),
+                        "temp": float(row.get('temp', 22)),
+                        "humidity": float(row.get('humidity', 50))
+                    }
+                except ValueError:
+                    continue
+                yield processed_row
+    except Exception as e:
+        print(f"Error loading rooms: {e}")
+
 def load_rooms_from_csv(file_path):
-    rooms = []
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, mode='r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Convert numeric strings to floats/ints
-                    try:
-                        processed_row = {
-                            "name": row.get('name', 'Unknown'),
-                            "class": row.get('class', 'ISO_8'),
-                            "area": float(row.get('area', 0)),
-                            "height": float(row.get('height', 0)),
-                            "supply_airflow_m3h": float(row.get('supply_airflow_m3h', 0)),
-                            "temp": float(row.get('temp', 22)),
-                            "humidity": float(row.get('humidity', 50))
-                        }
-                        rooms.append(processed_row)
-                    except ValueError:
-                        continue
-        except Exception as e:
-            print(f"Error loading rooms: {e}")
-    return rooms
+    return list(iter_rooms_from_csv(file_path))
+
+def rooms_to_columns(rooms):
+    """Converts a list of room dicts into the column layout used by validate_rooms_batch"""
+    keys = ("name", "class", "area", "height", "supply_airflow_m3h", "temp", "humidity")
+    return {key: [room[key] for room in rooms] for key in keys}
+
+def iter_equipment_from_csv(file_path):
+    """Yields raw equipment schedule rows one at a time"""
+    if not os.path.exists(file_path):
+        return
+    with open_schedule(file_path) as f:
+        yield from csv.DictReader(f)
 
 def load_equipment_from_csv(file_path):
-    equipment_data = []
-    if os.path.exists(file_path):
-        try:
-            # Try utf-8-sig first (covers Excel-exported CSVs with BOM)
-            with open(file_path, mode='r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    equipment_data.append(row)
-        except UnicodeDecodeError:
-            # Fallback to latin-1 if utf-8 fails (common for older Excel formats or special chars)
-            with open(file_path, mode='r', encoding='latin-1') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    equipment_data.append(row)
-    return equipment_data
-
-def get_next_audit_paths(base_dir):
-    if not os.path.exists(base_dir):
-        os.makedirs(base_dir)
-    
-    count = 1
+    return list(iter_equipment_from_csv(file_path))
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
     while True:
-        base_name = f"audit_{count}"
-        txt_path = os.path.join(base_dir, f"{base_name}.txt")
-        json_path = os.path.join(base_dir, f"{base_name}.json")
-        if not os.path.exists(txt_path) and not os.path.exists(json_path):
-            return txt_path, json_path
-        count += 1
-
-class Logger(object):
-    def __init__(self, filename):
-        self.terminal = sys.stdout
-        self.log = open(filename, "a")
-
-    def write(self, message):
-        self.terminal.write(message)
-        self.log.write(message)
-
-    def flush(self):
-        self.terminal.flush()
-        self.log.flush()
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def room_row_from_report(report, comfort, room_class=None):
+    """`comfort` is a thermal_comfort() result: comfort label plus exact PMV/PPD"""
+    return {
+        "name": report["room_name"],
+        "ach": report["calculated_ach"],
+        "status": report["status"],
+        "comfort": comfort["comfort"],
+        "pmv": comfort["pmv"],
+        "ppd": comfort["ppd"],
+        "class": room_class
+    }
+
+class DeltaTracker(object):
+    """Reuses stored results for schedule rows that have not changed since the last delta run.
+
+    The cache is per job and schedule file, so one job reference used for
+    several schedules keeps a separate history for each. Rows are keyed on
+    room `name` / equipment `Mark` (with an occurrence suffix for
+    duplicates) and hashed together with the standards and rule
+    table, so editing either forces re-validation. Status changes, added and
+    removed rows are collected for the diff report.
+    """
+    def __init__(self, store, job_reference, input_file, run_id, agent):
+        self.store = store
+        self.job_reference = job_reference
+        self.input_file = input_file
+        self.run_id = run_id
+        # Row columns too: results cached in an older row shape are re-validated
+        self.fingerprint = json.dumps([agent.standards, agent.rules, agent.comfort.describe(), ROOM_COLUMNS,
+                                       EQUIPMENT_COLUMNS], sort_keys=True)
+        self.occurrences = {}
+        self.changes = []
+        self.reused = 0
+        self.revalidated = 0
+
+    def key_rows(self, kind, rows, key_field):
+        keyed = []
+        for row in rows:
+            name = str(row.get(key_field) or "")
+            count = self.occurrences.get((kind, name), 0)
+            self.occurrences[(kind, name)] = count + 1
+            key = name if count == 0 else f"{name}#{count}"
+            raw = json.dumps(sorted(row.items(), key=lambda kv: str(kv[0])))
+            row_hash = hashlib.sha1((self.fingerprint + raw).encode("utf-8")).hexdigest()
+            keyed.append((key, row_hash, row))
+        return keyed
+
+    def resolve(self, kind, keyed, validate):
+        """Returns results in row order, calling validate(rows) only for new/changed rows"""
+        cached = self.store.get_cached_rows(self.job_reference, self.input_file, kind, [key for key, _, _ in keyed])
+        stale = [row for key, row_hash, row in keyed if cached.get(key, (None,))[0] != row_hash]
+        fresh = iter(validate(stale)) if stale else iter(())
+
+        results = []
+        updates = []
+        for key, row_hash, row in keyed:
+            previous = cached.get(key)
+            if previous and previous[0] == row_hash:
+                result = previous[1]
+                self.reused += 1
+            else:
+                result = next(fresh)
+                self.revalidated += 1
+                if previous is None:
+                    self.changes.append({"kind": kind, "key": key, "change": "added",
+                                         "old_status": None, "new_status": result["status"]})
+                elif previous[1]["status"] != result["status"]:
+                    self.changes.append({"kind": kind, "key": key, "change": "status_changed",
+                                         "old_status": previous[1]["status"], "new_status": result["status"]})
+            updates.append((key, row_hash, result))
+            results.append(result)
+        # Stamp reused rows too, so they are not reported as removed
+        self.store.put_cached_rows(self.job_reference, self.input_file, kind, updates, self.run_id)
+        return results
+
+    def finish(self):
+        for kind, key, result in self.store.pop_stale_rows(self.job_reference, self.input_file, self.run_id):
+            self.changes.append({"kind": kind, "key": key, "change": "removed",
+                                 "old_status": result["status"], "new_status": None})
+        return {
+            "reused": self.reused,
+            "revalidated": self.revalidated,
+            "changes": self.changes
+        }
+
+def _validate_room_chunk(agent, rooms):
+    """Room rows for a chunk, batched through validate_rooms_batch when numpy is available"""
+    if load_numpy() is None:
+        return [room_row_from_report(agent.validate_ventilation(room), agent.thermal_comfort(room), room['class'])
+                for room in rooms]
+    batch = agent.validate_rooms_batch(rooms_to_columns(rooms))
+    comfort = ({"comfort": label, "pmv": reported(pmv), "ppd": reported(ppd)} for label, pmv, ppd in
+               zip(batch['comfort'].tolist(), batch['pmv'].tolist(), batch['ppd'].tolist()))
+    return [room_row_from_report(report, values, room['class'])
+            for (report, _), values, room in zip(agent.iter_room_results(batch), comfort, rooms)]
+
+def iter_room_rows(agent, rooms, delta=None, batch_size=ROOM_BATCH_SIZE):
+    """Yields JSON room rows, skipping re-validation of unchanged rooms when a DeltaTracker is given"""
+    if delta is None:
+        for chunk in iter_chunks(rooms, batch_size):
+            yield from _validate_room_chunk(agent, chunk)
+        return
+    for chunk in iter_chunks(rooms, batch_size):
+        keyed = delta.key_rows("room", chunk, "name")
+        yield from delta.resolve("room", keyed, lambda stale: _validate_room_chunk(agent, stale))
+
+def iter_equipment_rows(agent, rows, delta=None, batch_size=STORE_BATCH_SIZE):
+    """Yields validate_equipment results, reusing unchanged rows when a DeltaTracker is given"""
+    if delta is None:
+        for row in rows:
+            yield agent.validate_equipment(row)
+        return
+    for chunk in iter_chunks(rows, batch_size):
+        keyed = delta.key_rows("equipment", chunk, "Mark")
+        yield from delta.resolve("equipment", keyed, lambda stale: [agent.validate_equipment(r) for r in stale])
+
+class AuditJSONWriter(object):
+    """Streams the audit JSON to disk section by section.
+
+    Output is byte-for-byte what json.dump(audit_data, f, indent=4) produced,
+    without holding the rooms/equipment lists in memory.
+    """
+    def __init__(self, filename, header, buffering=-1):
+        self.file = open(filename, "w", buffering=buffering)
+        self.file.write("{")
+        self.first_key = True
+        self.items = 0
+        for key, value in header.items():
+            self._write_key(key)
+            self.file.write(json.dumps(value))
+
+    def _write_key(self, key):
+        self.file.write(("\n" if self.first_key else ",\n") + f"    {json.dumps(key)}: ")
+        self.first_key = False
+
+    def begin_list(self, key):
+        self._write_key(key)
+        self.file.write("[")
+        self.items = 0
+
+    def add(self, item):
+        body = json.dumps(item, indent=4).replace("\n", "\n        ")
+        self.file.write(("\n" if self.items == 0 else ",\n") + "        " + body)
+        self.items += 1
+
+    def end_list(self):
+        self.file.write("\n    ]" if self.items else "]")
+
+    def add_value(self, key, value):
+        self._write_key(key)
+        self.file.write(json.dumps(value, indent=4).replace("\n", "\n    "))
+
+    def close(self):
+        self.file.write("\n}")
+        self.file.close()
+
+class ReportSink(object):
+    """Structured audit output replacing the stdout tee.
+
+    Result rows are formatted once and written through large buffers to the
+    TXT and JSON reports, plus optional CSV (<base>_rooms.csv /
+    <base>_equipment.csv) and NDJSON (<base>.ndjson) files. The console
+    copy is skipped entirely when quiet=True (headless/server runs).
+    """
+    def __init__(self, audit_txt, audit_json, header, quiet=False, formats=()):
+        self.console = None if quiet else sys.stdout
+        self.txt = open(audit_txt, "w", buffering=REPORT_BUFFER_BYTES)
+        self.json = AuditJSONWriter(audit_json, header, buffering=REPORT_BUFFER_BYTES)
+        self.paths = {"txt": audit_txt, "json": audit_json}
+
+        base = os.path.splitext(audit_json)[0]
+        self.csv_files = {}
+        self.csv_writers = {}
+        if "csv" in formats:
+            for section, columns in (("rooms", ROOM_COLUMNS), ("equipment", EQUIPMENT_COLUMNS)):
+                path = f"{base}_{section}.csv"
+                self.csv_files[section] = open(path, "w", newline="", buffering=REPORT_BUFFER_BYTES)
+                self.csv_writers[section] = csv.DictWriter(self.csv_files[section], fieldnames=columns)
+                self.csv_writers[section].writeheader()
+                self.paths[f"csv_{section}"] = path
+        self.ndjson = None
+        if "ndjson" in formats:
+            self.paths["ndjson"] = f"{base}.ndjson"
+            self.ndjson = open(self.paths["ndjson"], "w", buffering=REPORT_BUFFER_BYTES)
+
+    def line(self, text=""):
+        text += "\n"
+        self.txt.write(text)
+        if self.console:
+            self.console.write(text)
+
+    def begin_section(self, key):
+        self.json.begin_list(key)
+
+    def end_section(self):
+        self.json.end_list()
+
+    def room(self, row):
+        pmv = "-" if row['pmv'] is None else row['pmv']
+        ppd = "-" if row['ppd'] is None else f"{row['ppd']}%"
+        self.line(f"Room: {row['name']:<25} | ACH: {row['ach']:>6} | Status: {row['status']:<4} | Comfort: {row['comfort']:<11} | PMV: {pmv:>5} | PPD: {ppd}")
+        self._structured("rooms", row)
+
+    def equipment(self, row):
+        self.line(f"{row['mark']:<10} | {row['category']:<15} | {row['status']:<6} | {row['issues']}")
+        self._structured("equipment", row)
+
+    def _structured(self, section, row):
+        self.json.add(row)
+        if section in self.csv_writers:
+            self.csv_writers[section].writerow(row)
+        if self.ndjson:
+            self.ndjson.write(json.dumps(dict(row, section=section)) + "\n")
+
+    def citations(self, cited):
+        """Writes the regulation citations section (audit_citations.cite_failures output)"""
+        self.line("\n" + "="*60)
+        self.line("--- REGULATION CITATIONS ---")
+        self.line("="*60)
+        if cited.get("error"):
+            self.line(f"[!] Citations unavailable: {cited['error']}")
+        for failure in cited["failure_types"]:
+            refs = "; ".join(f"{c['source']} p.{c['page']}" for c in failure["citations"]) or "-"
+            self.line(f"{failure['subject']:<15} | {failure['issue']:<30} | {failure['findings']:>4} | {refs}")
+        self.json.add_value("citations", cited)
+
+    def add_metrics(self, metrics):
+        """Records bytes written so far and appends the metrics block to the JSON report"""
+        metrics.bytes_written["txt"] = self.txt.tell()
+        metrics.bytes_written["json"] = self.json.file.tell()
+        for section, f in self.csv_files.items():
+            metrics.bytes_written[f"csv_{section}"] = f.tell()
+        if self.ndjson:
+            metrics.bytes_written["ndjson"] = self.ndjson.tell()
+        report = metrics.to_dict()
+        self.json.add_value("metrics", report)
+        return report
+
+    def close(self):
+        self.json.close()
+        self.txt.close()
+        for f in self.csv_files.values():
+            f.close()
+        if self.ndjson:
+            self.ndjson.close()
 
 import argparse
 
@@ -181,15 +495,333 @@ def interactive_setup(project_dir):
 
     return selected_csv, job_ref
 
+def run_audit(csv_path, job_reference, room_csv_path, audit_txt, audit_json, store=None, run_id=None,
+              quiet=False, formats=(), delta=False, comfort_grid=False, progress=None, citations=False,
+              startup_seconds=None):
+    """Validates one room + equipment schedule pair and writes its reports.
+
+    Output goes through a ReportSink (TXT + JSON, optional CSV/NDJSON;
+    console copy unless quiet). When an AuditStore and its allocated run_id
+    are given, result rows are also indexed there, and delta=True reuses
+    results for rows unchanged since the job's previous delta run and writes
+    a <base>_delta.json diff. comfort_grid=True evaluates PMV from the
+    precomputed interpolation grid (error bound recorded in the JSON).
+    Per-stage timings, rows/sec, failures per rule and bytes written are
+    added to the JSON as "metrics" (with startup_seconds when the caller
+    is a fresh CLI process that measured it). `progress`, if given, is called as
+    progress(stage="rows_validated", done=..., rooms=..., equipment=...)
+    after each chunk. citations=True collects the distinct failure types
+    and attaches manual/page citations for them from one batched RAG
+    search (audit_citations.py) as "citations". Returns a small summary
+    dict for batch roll-ups.
+    """
+    summary = {
+        "job_reference": job_reference,
+        "input_file": os.path.basename(csv_path),
+        "audit_txt": audit_txt,
+        "audit_json": audit_json,
+        "rooms": 0,
+        "rooms_failed": 0,
+        "equipment": 0,
+        "equipment_failed": 0
+    }
+
+    metrics = AuditMetrics(startup_seconds)
+    agent = LabMEPAgent(comfort_grid=comfort_grid)
+    agent.metrics = metrics
+
+    # Reports are streamed to disk as rows are validated
+    run_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    sink = ReportSink(audit_txt, audit_json, {
+        "job_reference": job_reference,
+        "run_date": run_date,
+        "input_file": os.path.basename(csv_path),
+        "comfort_model": agent.comfort.describe()
+    }, quiet=quiet, formats=formats)
+
+    sink.line(f"\nJOB REFERENCE: {job_reference}")
+    sink.line(f"INPUT FILE: {os.path.basename(csv_path)}")
+    sink.line(f"RUN DATE: {run_date}")
+    sink.line(f"AUDIT LOGS: \n - {audit_txt}\n - {audit_json}\n")
+
+    # Room Data Logic (Streamed from RoomSchedule.csv)
+    room_stream = iter_rooms_from_csv(room_csv_path)
+    with metrics.stage("load_rooms"):
+        first_room = next(room_stream, None)
+    
+    if first_room is None:
+        sink.line("[!] No room data found. Check RoomSchedule.csv")
+        room_stream = iter(())
+    else:
+        room_stream = itertools.chain([first_room], room_stream)
+
+    tracker = DeltaTracker(store, job_reference, os.path.basename(csv_path), run_id, agent) if delta and store else None
+    failures = FailureTypes() if citations else None
+    
+    sink.line("="*60)
+    sink.line("--- MEP VALIDATION REPORT (ISO 14644-1 COMPLIANCE) ---")
+    sink.line("="*60)
+    sink.begin_section("rooms")
+    # Timed per chunk: loading, validation, report output and store writes
+    for chunk in metrics.timed_iter("load_rooms", iter_chunks(room_stream, ROOM_BATCH_SIZE)):
+        metrics.add_rows("load_rooms", len(chunk))
+        with metrics.stage("validate_rooms", len(chunk)):
+            room_rows = list(iter_room_rows(agent, chunk, tracker))
+
+        # Add to reports
+        with metrics.stage("write_reports", len(room_rows)):
+            for room_row in room_rows:
+                summary["rooms"] += 1
+                if room_row["status"] == "FAIL":
+                    summary["rooms_failed"] += 1
+                    metrics.failure("Room: below minimum ACH")
+                    if failures is not None:
+                        failures.add_room(room_row)
+                if room_row["comfort"] != "Optimal":
+                    metrics.failure("Room: thermal comfort sub-optimal")
+                sink.room(room_row)
+        if store:
+            with metrics.stage("store_writes", len(room_rows)):
+                for start in range(0, len(room_rows), STORE_BATCH_SIZE):
+                    store.add_rooms(run_id, room_rows[start:start + STORE_BATCH_SIZE])
+        if progress:
+            progress(stage="rows_validated", done=summary["rooms"], rooms=summary["rooms"], equipment=0)
+    sink.end_section()
+
+    # Equipment Data Logic
+    equipment_stream = iter_equipment_from_csv(csv_path)
+    with metrics.stage("load_equipment"):
+        first_equip = next(equipment_stream, None)
+    
+    sink.begin_section("equipment")
+    if first_equip is not None:
+        sink.line("\n" + "="*60)
+        sink.line("--- EQUIPMENT SCHEDULE VALIDATION ---")
+        sink.line("="*60)
+        sink.line(f"{'Mark':<10} | {'Category':<15} | {'Status':<6} | {'Issues'}")
+        sink.line("-" * 60)
+        equipment_chunks = iter_chunks(itertools.chain([first_equip], equipment_stream), ROOM_BATCH_SIZE)
+        for chunk in metrics.timed_iter("load_equipment", equipment_chunks):
+            metrics.add_rows("load_equipment", len(chunk))
+            with metrics.stage("validate_equipment", len(chunk)):
+                results = list(iter_equipment_rows(agent, chunk, tracker))
+
+            # Add to reports
+            with metrics.stage("write_reports", len(results)):
+                for res in results:
+                    summary["equipment"] += 1
+                    if res["status"] == "FAIL":
+                        summary["equipment_failed"] += 1
+                        # Rule messages are joined with ", " by validate_equipment
+                        for issue in res["issues"].split(", "):
+                            metrics.failure(issue)
+                        if failures is not None:
+                            failures.add_equipment(res)
+                    sink.equipment(res)
+            if store:
+                with metrics.stage("store_writes", len(results)):
+                    for start in range(0, len(results), STORE_BATCH_SIZE):
+                        store.add_equipment(run_id, results[start:start + STORE_BATCH_SIZE])
+            if progress:
+                progress(stage="rows_validated", done=summary["rooms"] + summary["equipment"],
+                         rooms=summary["rooms"], equipment=summary["equipment"])
+    else:
+        sink.line(f"\n[!] No equipment data found in: {os.path.basename(csv_path)}")
+    sink.end_section()
+
+    if tracker:
+        diff = tracker.finish()
+        diff_path = os.path.splitext(audit_json)[0] + "_delta.json"
+        with open(diff_path, 'w') as df:
+            json.dump(diff, df, indent=4)
+        sink.paths["delta"] = diff_path
+        summary["delta"] = {"reused": diff["reused"], "revalidated": diff["revalidated"], "changes": len(diff["changes"])}
+
+        sink.line("\n" + "="*60)
+        sink.line("--- DELTA SINCE PREVIOUS RUN ---")
+        sink.line("="*60)
+        sink.line(f"Reused: {diff['reused']} | Re-validated: {diff['revalidated']} | Changes: {len(diff['changes'])}")
+        for change in diff["changes"]:
+            sink.line(f"{change['kind']:<10} | {change['key']:<25} | {change['change']:<14} | {change['old_status'] or '-'} -> {change['new_status'] or '-'}")
+
+    if failures is not None:
+        with metrics.stage("citations", len(failures)):
+            cited = cite_failures(failures)
+        sink.citations(cited)
+        summary["citations"] = {"failure_types": len(cited["failure_types"]), "sources": len(cited["sources"])}
+
+    summary["metrics"] = sink.add_metrics(metrics)
+
+    sink.line("\n" + "="*60)
+    sink.line(f"Report complete for Job: {job_reference}")
+    sink.line(f"Audits saved to:\n - {audit_txt}\n - {audit_json}")
+    sink.line("="*60)
+
+    # Finalise reports
+    sink.close()
+    if store:
+        store.finish_run(run_id, run_date)
+        # The run and its reports are complete either way; a run missed here is rolled up by the next catch_up
+        try:
+            AuditAnalytics(store).apply_run(run_id)
+        except Exception as e:
+            print(f"[!] Analytics rollup for run {run_id} skipped: {e}", file=sys.stderr)
+    summary["reports"] = sink.paths
+
+    return summary
+
+def fail_run(store, run_id):
+    """Marks an allocated run as failed, so an audit that raised is not left 'running'"""
+    store.finish_run(run_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), status="failed")
+
+def _safe_name(text):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in text) or "job"
+
+def load_batch_jobs(source, room_csv_path):
+    """Reads a batch from a directory of CSVs (job ref = file stem) or a manifest CSV.
+
+    Manifest columns: file, job and optionally rooms. Relative paths resolve
+    against the manifest's directory. Jobs come back sorted so output names
+    are stable between runs.
+    """
+    jobs = []
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, "*.csv"))):
+            jobs.append({"file": path, "job": os.path.splitext(os.path.basename(path))[0], "rooms": room_csv_path})
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open_schedule(source) as f:
+            for row in csv.DictReader(f):
+                if not row.get('file'):
+                    continue
+                rooms = row.get('rooms') or room_csv_path
+                jobs.append({
+                    "file": os.path.join(base_dir, row['file']),
+                    "job": row.get('job') or os.path.splitext(os.path.basename(row['file']))[0],
+                    "rooms": os.path.join(base_dir, rooms)
+                })
+    jobs.sort(key=lambda job: (job["job"], job["file"]))
+    return jobs
+
+def _run_batch_job(job):
+    # Runs in a pool worker: reports only, no console output
+    store = AuditStore(job["audit_dir"])
+    try:
+        run_id, _, _ = store.allocate_run(job["job"], os.path.basename(job["file"]), job["audit_txt"], job["audit_json"])
+        audit_args = (job["file"], job["job"], job["rooms"], job["audit_txt"], job["audit_json"], store, run_id)
+        options = {"quiet": True, "formats": job.get("formats", ()), "delta": job.get("delta", False),
+                   "comfort_grid": job.get("comfort_grid", False), "citations": job.get("citations", False)}
+        try:
+            if job.get("profile"):
+                return profiled(os.path.splitext(job["audit_json"])[0] + ".prof", run_audit, *audit_args, **options)
+            return run_audit(*audit_args, **options)
+        except Exception:
+            fail_run(store, run_id)
+            raise
+    except Exception as e:
+        return {"job_reference": job["job"], "input_file": os.path.basename(job["file"]), "error": str(e)}
+    finally:
+        store.close()
+
+def run_batch(jobs, output_dir, workers=None, audit_dir=None, formats=(), delta=False, comfort_grid=False,
+              profile=False, citations=False):
+    """Fans audits out over a process pool and writes batch_summary.json.
+
+    Output paths are assigned up front from the sorted job order
+    (NNNN_<job>.txt/.json), so reruns of the same batch overwrite the same
+    files instead of racing for audit_N slots. With delta=True, two jobs
+    sharing a job reference and schedule file name would overwrite each
+    other's row cache while running concurrently, so they raise ValueError.
+    """
+    if delta:
+        seen = set()
+        for job in jobs:
+            key = (job["job"], os.path.basename(job["file"]))
+            if key in seen:
+                raise ValueError(f"--delta needs distinct schedules per job; '{key[1]}' appears twice for job '{key[0]}'")
+            seen.add(key)
+    os.makedirs(output_dir, exist_ok=True)
+    for index, job in enumerate(jobs, 1):
+        base_name = f"{index:04d}_{_safe_name(job['job'])}"
+        job["audit_txt"] = os.path.join(output_dir, f"{base_name}.txt")
+        job["audit_json"] = os.path.join(output_dir, f"{base_name}.json")
+        # Batch runs are indexed in the same store as single runs
+        job["audit_dir"] = audit_dir or output_dir
+        job["formats"] = formats
+        job["delta"] = delta
+        job["comfort_grid"] = comfort_grid
+        job["profile"] = profile
+        job["citations"] = citations
+
+    # Deferred: only batch runs need the process pool machinery
+    import concurrent.futures
+
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        # map preserves job order regardless of completion order
+        results = list(pool.map(_run_batch_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    summary = {
+        "run_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "jobs": len(results),
+        "jobs_failed": sum(1 for r in results if "error" in r),
+        "rooms": sum(r.get("rooms", 0) for r in results),
+        "rooms_failed": sum(r.get("rooms_failed", 0) for r in results),
+        "equipment": sum(r.get("equipment", 0) for r in results),
+        "equipment_failed": sum(r.get("equipment_failed", 0) for r in results),
+        "results": results
+    }
+    summary_path = os.path.join(output_dir, "batch_summary.json")
+    with open(summary_path, 'w') as sf:
+        json.dump(summary, sf, indent=4)
+    return summary, summary_path
+
 # --- Main Report Execution ---
 if __name__ == "__main__":
+    # Interpreter start to here: only meaningful for this fresh CLI process
+    startup_seconds = process_startup_seconds()
     parser = argparse.ArgumentParser(description="MEP Audit Agent")
     parser.add_argument("--file", help="Path to the input CSV file")
     parser.add_argument("--job", help="Job Reference ID")
+    parser.add_argument("--batch", help="Directory of equipment CSVs or a manifest CSV (file,job[,rooms])")
+    parser.add_argument("--workers", type=int, help="Batch worker processes (default: all cores)")
+    parser.add_argument("--out", help="Batch output directory (default: 'audit runs/batch')")
+    parser.add_argument("--quiet", action="store_true", help="Skip the console copy of the report")
+    parser.add_argument("--csv", action="store_true", help="Also write rooms/equipment CSV reports")
+    parser.add_argument("--ndjson", action="store_true", help="Also write an NDJSON report")
+    parser.add_argument("--delta", action="store_true", help="Re-validate only rows changed since this job's last delta run")
+    parser.add_argument("--comfort-grid", action="store_true",
+                        help="Interpolate PMV from a precomputed grid (faster on large, varied schedules)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a cProfile trace (<audit>.prof, pstats/flamegraph tools) next to each report")
+    parser.add_argument("--cite", action="store_true",
+                        help="Attach manual/page citations for each distinct failure type (needs the manuals index)")
     args = parser.parse_args()
 
     project_dir = os.path.dirname(os.path.abspath(__file__))
-    
+    room_csv_path = os.path.join(project_dir, "RoomSchedule.csv")
+    audit_dir = os.path.join(project_dir, "audit runs")
+    formats = tuple(f for f, enabled in (("csv", args.csv), ("ndjson", args.ndjson)) if enabled)
+
+    if args.batch:
+        jobs = load_batch_jobs(args.batch, room_csv_path)
+        if not jobs:
+            print(f"[!] No schedules found in: {args.batch}")
+            sys.exit(1)
+        output_dir = args.out or os.path.join(audit_dir, "batch")
+        print(f"Running BATCH mode: {len(jobs)} jobs...")
+        try:
+            summary, summary_path = run_batch(jobs, output_dir, args.workers, audit_dir, formats, args.delta,
+                                             args.comfort_grid, args.profile, args.cite)
+        except ValueError as e:
+            print(f"[!] {e}")
+            sys.exit(1)
+        print(f"Rooms: {summary['rooms']} ({summary['rooms_failed']} FAIL) | "
+              f"Equipment: {summary['equipment']} ({summary['equipment_failed']} FAIL) | "
+              f"Job errors: {summary['jobs_failed']}")
+        print(f"Batch summary saved to:\n - {summary_path}")
+        sys.exit(0)
+
     if args.file and args.job:
         csv_path = args.file
         job_reference = args.job
@@ -198,77 +830,22 @@ if __name__ == "__main__":
         # Interactive Inputs
         csv_path, job_reference = interactive_setup(project_dir)
 
-    # Setup Paths
-    audit_dir = os.path.join(project_dir, "audit runs")
-    audit_txt, audit_json = get_next_audit_paths(audit_dir)
-    
-    # Setup TXT Logging (Redirects stdout)
-    sys.stdout = Logger(audit_txt)
-
-    # Prepare JSON Data Structure
-    audit_data = {
-        "job_reference": job_reference,
-        "run_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        "input_file": os.path.basename(csv_path),
-        "rooms": [],
-        "equipment": []
-    }
-
-    print(f"\nJOB REFERENCE: {job_reference}")
-    print(f"INPUT FILE: {os.path.basename(csv_path)}")
-    print(f"RUN DATE: {audit_data['run_date']}")
-    print(f"AUDIT LOGS: \n - {audit_txt}\n - {audit_json}\n")
-
-    # Room Data Logic (Dynamically loaded from RoomSchedule.csv)
-    room_csv_path = os.path.join(project_dir, "RoomSchedule.csv")
-    project_data = load_rooms_from_csv(room_csv_path)
-    
-    if not project_data:
-        print("[!] No room data found. Check RoomSchedule.csv")
-        # Fallback to empty list or basic structure
-        project_data = []
-
-    agent = LabMEPAgent(project_data)
-    
-    print("="*60)
-    print("--- MEP VALIDATION REPORT (ISO 14644-1 COMPLIANCE) ---")
-    print("="*60)
-    for room in project_data:
-        report = agent.validate_ventilation(room)
-        comfort = agent.check_thermal_comfort(room)
-        print(f"Room: {report['room_name']:<25} | ACH: {report['calculated_ach']:>6} | Status: {report['status']:<4} | Comfort: {comfort}")
-        
-        # Add to JSON
-        audit_data["rooms"].append({
-            "name": report["room_name"],
-            "ach": report["calculated_ach"],
-            "status": report["status"],
-            "comfort": comfort
-        })
-
-    # Equipment Data Logic
-    equipment_list = load_equipment_from_csv(csv_path)
+    # Setup Paths (run number allocated atomically by the audit store)
+    store = AuditStore(audit_dir)
+    run_id, audit_txt, audit_json = store.allocate_run(job_reference, os.path.basename(csv_path))
     
-    if equipment_list:
-        print("\n" + "="*60)
-        print("--- EQUIPMENT SCHEDULE VALIDATION ---")
-        print("="*60)
-        print(f"{'Mark':<10} | {'Category':<15} | {'Status':<6} | {'Issues'}")
-        print("-" * 60)
-        for equip in equipment_list:
-            res = agent.validate_equipment(equip)
-            print(f"{res['mark']:<10} | {res['category']:<15} | {res['status']:<6} | {res['issues']}")
-            
-            # Add to JSON
-            audit_data["equipment"].append(res)
-    else:
-        print(f"\n[!] No equipment data found in: {os.path.basename(csv_path)}")
-
-    # Save JSON Audit
-    with open(audit_json, 'w') as jf:
-        json.dump(audit_data, jf, indent=4)
-
-    print("\n" + "="*60)
-    print(f"Report complete for Job: {job_reference}")
-    print(f"Audits saved to:\n - {audit_txt}\n - {audit_json}")
-    print("="*60)
+    audit_args = (csv_path, job_reference, room_csv_path, audit_txt, audit_json, store, run_id)
+    options = {"quiet": args.quiet, "formats": formats, "delta": args.delta, "comfort_grid": args.comfort_grid,
+               "citations": args.cite, "startup_seconds": startup_seconds}
+    try:
+        if args.profile:
+            profile_path = os.path.splitext(audit_json)[0] + ".prof"
+            summary = profiled(profile_path, run_audit, *audit_args, **options)
+            print(f"Profile saved to:\n - {profile_path}")
+        else:
+            summary = run_audit(*audit_args, **options)
+    except BaseException:
+        fail_run(store, run_id)
+        raise
+    if args.quiet:
+        print(f"Audits saved to:\n - {audit_txt}\n - {audit_json}")
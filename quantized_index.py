@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+
+# --- CONFIGURATION ---
+INDEX_PREFIX = "quantized_index"  # quantized_index.{int8,f32,aux,sqlite3}, next to the Chroma store in DB_PATH
+RERANK_CANDIDATES = 64            # Rows re-scored at full precision per query
+SCAN_BLOCK = 256                  # Rows scored per int8 block; the float32 copy of a block stays in cache
+COMPACT_RATIO = 0.25              # compact() rewrites the files once this fraction of rows is deleted
+
+class View(object):
+    """Snapshot of the index files for searching; its .f32 handle is closed once
+    the view has been replaced and no search is still using it"""
+    def __init__(self, rows, dim, codes, vectors_fd, scales, norms, chunk_ids, alive):
+        self.rows = rows
+        self.dim = dim
+        self.codes = codes
+        self.vectors_fd = vectors_fd
+        self.scales = scales
+        self.norms = norms
+        self.chunk_ids = chunk_ids
+        self.alive = alive
+        self.users = 0
+        self.retired = False
+
+    def close(self):
+        self.vectors_fd.close()
+
+class QuantizedIndex(object):
+    """int8 vector index in memory-mapped files, with exact re-ranking.
+
+    Each vector is appended to two flat files: .int8 holds per-vector
+    symmetric int8 codes (scale = max|x| / 127), memory-mapped and scanned
+    for every query, and .f32 holds the full-precision vector; only the top
+    candidates' rows are read from it, with pread rather than a map, so page
+    read-around never pulls the whole file into memory. Per-row scale and
+    squared norm (.aux) are the only other per-row data held in memory. Scores are squared L2 distances, as in the
+    Chroma collection, so rankings agree. Rows map to chunk IDs (the same
+    IDs as Chroma and the keyword index) in a small SQLite table; deletes
+    drop the mapping and compact() reclaims the space. close() releases the
+    file handles.
+    """
+    def __init__(self, db_path):
+        self.base = os.path.join(db_path, INDEX_PREFIX)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.base + ".sqlite3", check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE)")
+        self.conn.commit()
+        self._view = None
+
+    @staticmethod
+    def exists(db_path):
+        return os.path.exists(os.path.join(db_path, INDEX_PREFIX + ".sqlite3"))
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, int(value)))
+
+    def _write_rows(self, suffix, start, array):
+        # Overwrite from `start`: bytes past the committed row count (an interrupted add) are discarded
+        path = self.base + suffix
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(start * array[0].nbytes if len(array) else 0)
+            f.write(array.tobytes())
+            f.truncate()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def add(self, chunk_ids, vectors):
+        """Appends vectors under chunk_ids (an existing ID is replaced)"""
+        import numpy as np
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(chunk_ids):
+            return
+        with self.lock:
+            dim = self._meta("dim") or vectors.shape[1]
+            if vectors.shape[1] != dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match the index ({dim})")
+            self._delete(chunk_ids)
+            start = self._meta("rows")
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            aux = np.stack([scales, np.einsum("ij,ij->i", vectors, vectors)], axis=1).astype(np.float32)
+            self._write_rows(".int8", start, codes)
+            self._write_rows(".f32", start, vectors)
+            self._write_rows(".aux", start, aux)
+            self.conn.executemany("INSERT INTO rows VALUES (?, ?)",
+                                  [(start + i, chunk_id) for i, chunk_id in enumerate(chunk_ids)])
+            self._set_meta("dim", dim)
+            self._set_meta("rows", start + len(chunk_ids))
+            self.conn.commit()
+            self._retire_view()
+
+    def _delete(self, chunk_ids):
+        for start in range(0, len(chunk_ids), 500):
+            chunk = list(chunk_ids[start:start + 500])
+            self.conn.execute(f"DELETE FROM rows WHERE chunk_id IN ({','.join('?' * len(chunk))})", chunk)
+
+    def delete(self, chunk_ids):
+        with self.lock:
+            self._delete(chunk_ids)
+            self.conn.commit()
+            self._retire_view()
+
+    def compact(self, ratio=COMPACT_RATIO):
+        """Rewrites the files without deleted rows once they exceed `ratio` of the total; True if it did"""
+        import numpy as np
+
+        with self.lock:
+            rows, dim = self._meta("rows"), self._meta("dim")
+            live = self.conn.execute("SELECT row, chunk_id FROM rows ORDER BY row").fetchall()
+            if not rows or (rows - len(live)) <= ratio * rows:
+                return False
+            keep = np.array([row for row, _ in live], dtype=np.int64)
+            for suffix, dtype, width in ((".int8", np.int8, dim), (".f32", np.float32, dim), (".aux", np.float32, 2)):
+                data = np.fromfile(self.base + suffix, dtype=dtype, count=rows * width).reshape(rows, width)
+                # Write-then-rename; open memory maps keep reading the old file
+                data[keep].tofile(self.base + suffix + ".tmp")
+                os.replace(self.base + suffix + ".tmp", self.base + suffix)
+            self.conn.execute("DELETE FROM rows")
+            self.conn.executemany("INSERT INTO rows VALUES (?, ?)",
+                                  [(i, chunk_id) for i, (_, chunk_id) in enumerate(live)])
+            self._set_meta("rows", len(live))
+            self.conn.commit()
+            self._retire_view()
+            return True
+
+    def _retire_view(self):
+        # Caller holds self.lock; a view still being searched is closed by the last _release_view()
+        view, self._view = self._view, None
+        if view is not None:
+            view.retired = True
+            if not view.users:
+                view.close()
+
+    def close(self):
+        with self.lock:
+            self._retire_view()
+            self.conn.close()
+
+    def _acquire_view(self):
+        """Current view (built on first use) marked as in use, or None for an empty index"""
+        import numpy as np
+
+        with self.lock:
+            if self._view is None:
+                rows, dim = self._meta("rows"), self._meta("dim")
+                if not rows:
+                    return None
+                chunk_ids = [None] * rows
+                for row, chunk_id in self.conn.execute("SELECT row, chunk_id FROM rows"):
+                    chunk_ids[row] = chunk_id
+                aux = np.fromfile(self.base + ".aux", dtype=np.float32, count=rows * 2).reshape(rows, 2)
+                self._view = View(
+                    rows=rows,
+                    dim=dim,
+                    codes=np.memmap(self.base + ".int8", dtype=np.int8, mode='r', shape=(rows, dim)),
+                    vectors_fd=open(self.base + ".f32", 'rb', buffering=0),
+                    scales=aux[:, 0].copy(),
+                    norms=aux[:, 1].copy(),
+                    chunk_ids=chunk_ids,
+                    alive=np.array([chunk_id is not None for chunk_id in chunk_ids])
+                )
+            self._view.users += 1
+            return self._view
+
+    def _release_view(self, view):
+        with self.lock:
+            view.users -= 1
+            if view.retired and not view.users:
+                view.close()
+
+    def search(self, vector, k=6, candidates=RERANK_CANDIDATES):
+        """Top-k [(chunk_id, squared L2 distance)]: int8 scan, then exact distances for the best candidates"""
+        return self.search_many([vector], k, candidates)[0]
+
+    def search_many(self, vectors, k=6, candidates=RERANK_CANDIDATES):
+        """search() for several queries in one pass over the int8 codes; one result list per query"""
+        view = self._acquire_view()
+        if view is None:
+            return [[] for _ in vectors]
+        try:
+            return self._search_view(view, vectors, k, candidates)
+        finally:
+            self._release_view(view)
+
+    def _search_view(self, view, vectors, k, candidates):
+        import numpy as np
+
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        # |x - q|^2 ranks like |x|^2 - 2 x.q; x.q is approximated from the int8 codes
+        approx = np.empty((view.rows, len(queries)), dtype=np.float32)
+        for start in range(0, view.rows, SCAN_BLOCK):
+            stop = start + SCAN_BLOCK
+            approx[start:stop] = (view.norms[start:stop, None]
+                                  - 2 * view.scales[start:stop, None] * (view.codes[start:stop] @ queries.T))
+        approx[~view.alive] = np.inf
+
+        n = min(max(candidates, k), int(view.alive.sum()))
+        if n == 0:
+            return [[] for _ in vectors]
+        row_bytes = view.dim * 4
+        fd = view.vectors_fd.fileno()
+        results = []
+        for column, query in enumerate(queries):
+            # Sorted rows so the full-precision reads walk the file forwards
+            top = np.sort(np.argpartition(approx[:, column], n - 1)[:n])
+            rows = np.frombuffer(b"".join(os.pread(fd, row_bytes, int(row) * row_bytes) for row in top),
+                                 dtype=np.float32).reshape(n, view.dim)
+            exact = ((rows - query) ** 2).sum(axis=1)
+            order = np.argsort(exact, kind="stable")[:k]
+            results.append([(view.chunk_ids[top[i]], float(exact[i])) for i in order])
+        return results
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import collections
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache", "queries.sqlite3")
+GENERATION_FILE = "index_generation"  # Written into the vector DB directory by ingest_manuals.py
+MEMORY_ENTRIES = 256    # In-process LRU size
+DISK_ENTRIES = 5000     # On-disk LRU size
+TTL_SECONDS = 24 * 3600
+
+def write_index_generation(db_path):
+    """Marks the vector index as changed; every cached query result becomes stale"""
+    generation = uuid.uuid4().hex
+    tmp_path = os.path.join(db_path, GENERATION_FILE + ".tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(generation)
+    os.replace(tmp_path, os.path.join(db_path, GENERATION_FILE))
+    return generation
+
+def read_index_generation(db_path):
+    try:
+        with open(os.path.join(db_path, GENERATION_FILE), 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        # Index built before generations existed: fall back to the store's mtime
+        chroma_file = os.path.join(db_path, "chroma.sqlite3")
+        return f"mtime-{os.path.getmtime(chroma_file)}" if os.path.exists(chroma_file) else "none"
+
+def normalize_query(text):
+    return " ".join(text.split())
+
+class QueryCache(object):
+    """Two-level LRU/TTL cache of query -> search results, keyed by index generation.
+
+    Lookups check the in-process LRU first, then SQLite. Entries from another
+    index generation or older than the TTL count as misses and are dropped.
+    """
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES, ttl=TTL_SECONDS):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.memory = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_results ("
+            " generation TEXT, query TEXT, k INTEGER, results TEXT, created REAL, last_used REAL,"
+            " PRIMARY KEY (generation, query, k))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_query_results_last_used ON query_results (last_used)")
+        self.conn.commit()
+        self.generation = None
+
+    def _check_generation(self, generation):
+        # Caller holds the lock
+        if generation != self.generation:
+            self.memory.clear()
+            self.conn.execute("DELETE FROM query_results WHERE generation != ?", (generation,))
+            self.conn.commit()
+            self.generation = generation
+
+    def get(self, generation, query, k):
+        key = (normalize_query(query), k)
+        now = time.time()
+        with self.lock:
+            self._check_generation(generation)
+            entry = self.memory.get(key)
+            if entry and now - entry[0] <= self.ttl:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            row = self.conn.execute(
+                "SELECT results, created FROM query_results WHERE generation = ? AND query = ? AND k = ?",
+                (generation, key[0], k)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self.conn.execute(
+                    "UPDATE query_results SET last_used = ? WHERE generation = ? AND query = ? AND k = ?",
+                    (now, generation, key[0], k)
+                )
+                self.conn.commit()
+                results = json.loads(row[0])
+                self._remember(key, row[1], results)
+                self.stats["disk_hits"] += 1
+                return results
+            self.memory.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, generation, query, k, results):
+        key = (normalize_query(query), k)
+        now = time.time()
+        with self.lock:
+            self._check_generation(generation)
+            self._remember(key, now, results)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO query_results (generation, query, k, results, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (generation, key[0], k, json.dumps(results), now, now)
+            )
+            self.conn.execute(
+                "DELETE FROM query_results WHERE created < ? OR rowid IN "
+                "(SELECT rowid FROM query_results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.disk_entries)
+            )
+            self.conn.commit()
+
+    def _remember(self, key, created, results):
+        self.memory[key] = (created, results)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            lookups = sum(stats.values())
+            hits = stats["memory_hits"] + stats["disk_hits"]
+            stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+            stats["memory_entries"] = len(self.memory)
+            stats["generation"] = self.generation
+            return stats
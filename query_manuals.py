@@ -2,53 +2,231 @@ import sys
 import os
 import json
 import warnings
+import threading
 
 # Silence LangChain deprecation warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", message=".*Chroma.*")
 
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
+from embedding_cache import CachedEmbeddings
+from query_cache import QueryCache, read_index_generation
+from keyword_index import KeywordIndex, fuse_results
+from quantized_index import QuantizedIndex
 
 # --- CONFIGURATION ---
 DB_PATH = "./local_db"
 EMBEDDING_MODEL = "nomic-embed-text"
+TOP_K = 6
+CANDIDATES = 20  # Per-retriever candidates fed into hybrid fusion
+# "chroma" (full-precision HNSW) or "quantized" (int8 memory-mapped index with
+# exact re-ranking, quantized_index.py); ingest_manuals.py writes both
+VECTOR_BACKEND = "chroma"
+
+# Opened once per process; long-lived callers (audit_worker.py) reuse it across queries
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
+_embeddings = None
+
+def get_embeddings(embeddings=None):
+    """Query embedder for either backend; `embeddings` (first call only) overrides the Ollama default"""
+    global _embeddings
+    with _vectorstore_lock:
+        if _embeddings is None:
+            if embeddings is None:
+                # LangChain loads here, not at import: cached queries and
+                # argument errors never pay for it
+                from langchain_ollama import OllamaEmbeddings
+
+                # Repeated questions are served from the disk cache
+                embeddings = CachedEmbeddings(OllamaEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
+            _embeddings = embeddings
+        return _embeddings
+
+def get_vectorstore(embeddings=None):
+    """Opens the Chroma store on first use; `embeddings` is passed to get_embeddings()"""
+    global _vectorstore
+    embeddings = get_embeddings(embeddings)
+    with _vectorstore_lock:
+        if _vectorstore is None:
+            from langchain_community.vectorstores import Chroma
+
+            # Load the Vector Store
+            _vectorstore = Chroma(
+                persist_directory=DB_PATH, 
+                embedding_function=embeddings
+            )
+        return _vectorstore
+
+_query_cache = None
+_keyword_index = None
+_quantized_index = None
+
+def get_keyword_index():
+    """BM25 index written alongside the vector store, or None for older indexes"""
+    global _keyword_index
+    with _vectorstore_lock:
+        if _keyword_index is None and KeywordIndex.exists(DB_PATH):
+            _keyword_index = KeywordIndex(DB_PATH)
+        return _keyword_index
+
+def get_quantized_index():
+    """int8 index written alongside the vector store, or None if ingest has not built it yet"""
+    global _quantized_index
+    with _vectorstore_lock:
+        if _quantized_index is None and QuantizedIndex.exists(DB_PATH):
+            _quantized_index = QuantizedIndex(DB_PATH)
+        return _quantized_index
+
+def get_query_cache(path=None):
+    global _query_cache
+    with _vectorstore_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache(path) if path else QueryCache()
+        return _query_cache
+
+def reset_vectorstore():
+    """Drops the cached store so the next query reopens it (call after re-indexing)"""
+    global _vectorstore, _keyword_index, _quantized_index, _embeddings
+    with _vectorstore_lock:
+        if _quantized_index is not None:
+            # Searches already running finish on their view before its file handle closes
+            _quantized_index.close()
+        if _vectorstore is not None:
+            # chromadb keeps one client per persist_directory for the life of the process; without this the
+            # reopened store reuses the old in-memory HNSW index and misses ingest_manuals.py's changes
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        _vectorstore = None
+        _keyword_index = None
+        _quantized_index = None
+        _embeddings = None
+
+def _chunk_item(content, metadata):
+    return {
+        "content": content,
+        "source": metadata.get("source_manual", "Unknown Source"),
+        "page": metadata.get("page", "N/A")
+    }
+
+def similarity_search(query_text, k):
+    """Top-k chunks by vector similarity as {content, source, page} dicts, from VECTOR_BACKEND"""
+    if VECTOR_BACKEND == "quantized":
+        return similarity_search_by_vectors([get_embeddings().embed_query(query_text)], k)[0]
+
+    return [_chunk_item(doc.page_content, doc.metadata)
+            for doc in get_vectorstore().similarity_search(query_text, k=k)]
+
+def embed_queries(query_texts):
+    """Query vectors for many texts in one embedding batch (one call per text if the embedder cannot batch)"""
+    embeddings = get_embeddings()
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(query_texts)
+    return [embeddings.embed_query(text) for text in query_texts]
+
+def similarity_search_by_vectors(vectors, k):
+    """similarity_search for several query vectors in one search call; one result list per vector"""
+    if VECTOR_BACKEND == "quantized":
+        quantized_index = get_quantized_index()
+        keyword_index = get_keyword_index()
+        if quantized_index is None or keyword_index is None:
+            raise RuntimeError("Quantized index not found. Please run ingest_manuals.py first.")
+        hits = quantized_index.search_many(vectors, k)
+        # Chunk text and metadata are stored once, in the keyword index (same chunk IDs)
+        chunks = keyword_index.get_chunks(list({chunk_id for query_hits in hits for chunk_id, _ in query_hits}))
+        return [[chunks[chunk_id] for chunk_id, _ in query_hits if chunk_id in chunks] for query_hits in hits]
+
+    return chroma_search_many(get_vectorstore(), vectors, k)
+
+def chroma_search_many(vectorstore, vectors, k):
+    """One Chroma query for all vectors.
+
+    The LangChain wrapper only searches one vector at a time, so this uses
+    its underlying collection (the private `_collection` attribute,
+    langchain_community's Chroma). If a release drops that attribute, each
+    vector falls back to the public similarity_search_by_vector.
+    """
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is None or not hasattr(collection, "query"):
+        return [[_chunk_item(doc.page_content, doc.metadata)
+                 for doc in vectorstore.similarity_search_by_vector(list(vector), k=k)] for vector in vectors]
+    found = collection.query(query_embeddings=[list(v) for v in vectors], n_results=k,
+                             include=["documents", "metadatas"])
+    return [[_chunk_item(content, metadata or {}) for content, metadata in zip(documents, metadatas)]
+            for documents, metadatas in zip(found["documents"], found["metadatas"])]
+
+def rank_results(query_text, results, keyword_index):
+    """Drops duplicate chunks, then fuses with keyword hits when the index has them"""
+    response = []
+    seen_content = set()
+    for item in results:
+        # Basic deduplication based on content
+        if item["content"] not in seen_content:
+            response.append(item)
+            seen_content.add(item["content"])
+
+    if keyword_index:
+        # Hybrid: exact-term hits ("ISO 7", "ACH") fused with semantic matches
+        keyword_hits = [item for _, item in keyword_index.search(query_text, k=CANDIDATES)]
+        response = fuse_results(response, keyword_hits, k=TOP_K)
+    return response
 
 def query_vector_db(query_text):
     if not os.path.exists(DB_PATH):
         return {"error": "Vector database not found. Please run ingest_manuals.py first."}
 
     try:
-        # Initialize Embeddings
-        embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
-        
-        # Load the Vector Store
-        vectorstore = Chroma(
-            persist_directory=DB_PATH, 
-            embedding_function=embeddings
-        )
+        # Cached results are keyed on the index generation written at ingest (and the backend)
+        generation = f"{read_index_generation(DB_PATH)}-{VECTOR_BACKEND}"
+        query_cache = get_query_cache()
+        cached = query_cache.get(generation, query_text, TOP_K)
+        if cached is not None:
+            return {"results": cached}
+
+        keyword_index = get_keyword_index()
 
         # Perform Similarity Search
         # k=6: Get more relevant snippets to provide fuller context
-        results = vectorstore.similarity_search(query_text, k=6)
-
-        response = []
-        seen_content = set()
-        for doc in results:
-            # Basic deduplication based on content
-            if doc.page_content not in seen_content:
-                response.append({
-                    "content": doc.page_content,
-                    "source": doc.metadata.get("source_manual", "Unknown Source"),
-                    "page": doc.metadata.get("page", "N/A")
-                })
-                seen_content.add(doc.page_content)
+        # (over-fetch when fusing with keyword hits, then trim after fusion)
+        results = similarity_search(query_text, k=CANDIDATES if keyword_index else TOP_K)
 
+        response = rank_results(query_text, results, keyword_index)
+        query_cache.put(generation, query_text, TOP_K, response)
         return {"results": response}
 
     except Exception as e:
         return {"error": str(e)}
 
+def query_batch(query_texts):
+    """query_vector_db for many queries: cache misses are embedded in one batch and searched in one call.
+
+    Returns {"results": {query: [...]}} with the same per-query results as
+    query_vector_db, or {"error": ...}.
+    """
+    if not os.path.exists(DB_PATH):
+        return {"error": "Vector database not found. Please run ingest_manuals.py first."}
+
+    try:
+        generation = f"{read_index_generation(DB_PATH)}-{VECTOR_BACKEND}"
+        query_cache = get_query_cache()
+        answers = {}
+        for query_text in query_texts:
+            cached = query_cache.get(generation, query_text, TOP_K)
+            if cached is not None:
+                answers[query_text] = cached
+        misses = [query_text for query_text in dict.fromkeys(query_texts) if query_text not in answers]
+
+        if misses:
+            keyword_index = get_keyword_index()
+            searches = similarity_search_by_vectors(embed_queries(misses),
+                                                    k=CANDIDATES if keyword_index else TOP_K)
+            for query_text, results in zip(misses, searches):
+                answers[query_text] = rank_results(query_text, results, keyword_index)
+                query_cache.put(generation, query_text, TOP_K, answers[query_text])
+        return {"results": answers}
+
+    except Exception as e:
+        return {"error": str(e)}
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({"error": "No query provided"}))
@@ -1,6 +1,7 @@
 import express from 'express';
 import cors from 'cors';
-import { exec } from 'child_process';
+import { exec, spawn } from 'child_process';
+import readline from 'readline';
 import path from 'path';
 import fs from 'fs';
 import { fileURLToPath } from 'url';
@@ -15,6 +16,134 @@ const PROJECT_ROOT = __dirname;
 const COMMENTS_FILE = path.join(PROJECT_ROOT, 'src', 'comments.json');
 const FEEDBACK_FILE = path.join(PROJECT_ROOT, 'src', 'feedback.json');
 
+// --- Persistent Python worker (audit_worker.py) ---
+// One interpreter keeps the validator and vector store loaded and serves
+// newline-delimited JSON-RPC over stdin/stdout, instead of exec() per request.
+let pyWorker = null;
+let nextRpcId = 1;
+const pendingRpc = new Map();
+// Background jobs (audits, reindexes) push progress as job_event notifications
+const jobListeners = new Map();
+const JOB_DONE = ['done', 'failed', 'interrupted'];
+
+function getPyWorker() {
+    if (pyWorker) return pyWorker;
+
+    const child = spawn('python3', [path.join(PROJECT_ROOT, 'audit_worker.py')], {
+        cwd: PROJECT_ROOT,
+        stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    readline.createInterface({ input: child.stdout }).on('line', line => {
+        let msg;
+        try {
+            msg = JSON.parse(line);
+        } catch (e) {
+            console.error('Worker sent invalid JSON:', line);
+            return;
+        }
+        if (msg.method === 'job_event') return notifyJob(msg.params);
+        const pending = pendingRpc.get(msg.id);
+        if (!pending) return;
+        pendingRpc.delete(msg.id);
+        clearTimeout(pending.timer);
+        if (msg.error) pending.reject(new Error(msg.error));
+        else pending.resolve(msg.result);
+    });
+
+    // Report text and warnings from the worker
+    child.stderr.on('data', data => process.stderr.write(data));
+
+    let gone = false;
+    const workerGone = reason => {
+        // 'error' and 'exit' can both fire for one child; clean up once
+        if (gone) return;
+        gone = true;
+        console.error(`Python worker ${reason}; it will restart on the next request`);
+        if (pyWorker === child) pyWorker = null;
+        for (const [id, pending] of pendingRpc) {
+            clearTimeout(pending.timer);
+            pending.reject(new Error(`Python worker ${reason}`));
+            pendingRpc.delete(id);
+        }
+        // Jobs do not survive the worker; the job table marks them interrupted on restart
+        for (const jobId of [...jobListeners.keys()]) {
+            notifyJob({ job_id: jobId, type: 'status', status: 'interrupted', error: `Python worker ${reason}` });
+        }
+    };
+
+    child.on('exit', code => workerGone(`exited (code ${code})`));
+    // Spawn failures (python3 missing) and EPIPE on a dead worker's stdin arrive as
+    // 'error' events; unhandled, they would crash the server
+    child.on('error', err => workerGone(`failed: ${err.message}`));
+    child.stdin.on('error', err => {
+        workerGone(`stdin failed: ${err.message}`);
+        child.kill();
+    });
+
+    pyWorker = child;
+    return child;
+}
+
+function callWorker(method, params, timeoutMs = 60000) {
+    return new Promise((resolve, reject) => {
+        const id = nextRpcId++;
+        const timer = setTimeout(() => {
+            pendingRpc.delete(id);
+            reject(new Error(`Worker call '${method}' timed out`));
+        }, timeoutMs);
+        pendingRpc.set(id, { resolve, reject, timer });
+        getPyWorker().stdin.write(JSON.stringify({ id, method, params }) + '\n');
+    });
+}
+
+function notifyJob(event) {
+    for (const listener of [...(jobListeners.get(event.job_id) || [])]) listener(event);
+}
+
+// Calls listener(event) for each job event until the returned function is called
+function watchJob(jobId, listener) {
+    if (!jobListeners.has(jobId)) jobListeners.set(jobId, new Set());
+    jobListeners.get(jobId).add(listener);
+    return () => {
+        const listeners = jobListeners.get(jobId);
+        if (!listeners) return;
+        listeners.delete(listener);
+        if (!listeners.size) jobListeners.delete(jobId);
+    };
+}
+
+// Resolves with the final job status (including its result) once the job finishes
+function waitForJob(jobId, timeoutMs) {
+    return new Promise((resolve, reject) => {
+        let settled = false;
+        const finish = () => {
+            if (settled) return;
+            settled = true;
+            clearTimeout(timer);
+            unwatch();
+            callWorker('job_status', { job_id: jobId }).then(resolve, reject);
+        };
+        const timer = setTimeout(() => {
+            settled = true;
+            unwatch();
+            reject(new Error(`Job ${jobId} did not finish in time`));
+        }, timeoutMs);
+        const unwatch = watchJob(jobId, event => {
+            if (event.type === 'status' && JOB_DONE.includes(event.status)) finish();
+        });
+        // The job may have finished before the listener was attached
+        callWorker('job_status', { job_id: jobId })
+            .then(job => { if (JOB_DONE.includes(job.status)) finish(); })
+            .catch(err => { if (!settled) { settled = true; clearTimeout(timer); unwatch(); reject(err); } });
+    });
+}
+
+function jobErrorStatus(err) {
+    // Back-pressure from the worker's bounded job queue
+    return err.message.startsWith('Job queue is full') ? 429 : 500;
+}
+
 app.use(cors());
 app.use(express.json({ limit: '50mb' }));
 app.use(express.urlencoded({ limit: '50mb', extended: true }));
@@ -83,13 +212,12 @@ app.get('/api/files', (req, res) => {
 
 // Endpoint to run the audit
 app.post('/api/run-audit', (req, res) => {
-    const { fileName, jobRef, fileContent } = req.body;
+    const { fileName, jobRef, fileContent, profile, citations, async: runAsync } = req.body;
 
     if (!fileName || !jobRef) {
         return res.status(400).json({ error: 'Missing filename or job reference' });
     }
 
-    const scriptPath = path.join(PROJECT_ROOT, 'mep_validator_agent_v2.py');
     let filePath = path.join(PROJECT_ROOT, fileName);
 
     // If file content is provided, save it as a new file on the server first
@@ -103,28 +231,24 @@ app.post('/api/run-audit', (req, res) => {
         }
     }
 
-    // Command to run the python script
-    const command = `python3 "${scriptPath}" --file "${filePath}" --job "${jobRef}"`;
-
-    exec(command, (error, stdout, stderr) => {
-        if (error) {
-            console.error(`Error: ${error.message}`);
-            return res.status(500).json({ error: 'Audit execution failed', details: stderr });
-        }
-
-        // Parse the output to find the new JSON path
-        const jsonMatch = stdout.match(/- (.+\.json)/);
-        if (jsonMatch && jsonMatch[1]) {
-            const jsonPath = jsonMatch[1];
-            // Read the newly created JSON file
-            fs.readFile(jsonPath, 'utf8', (err, data) => {
-                if (err) return res.status(500).json({ error: 'Cannot read result file' });
-                res.json(JSON.parse(data));
+    // profile: true also writes a cProfile trace next to the audit JSON.
+    // citations: true attaches manual/page citations per distinct failure type
+    // (one batched RAG search) instead of one /api/rag-query per finding.
+    // async: true answers 202 with a job to follow on /api/jobs/:id; otherwise
+    // the request waits for the queued job and returns the audit JSON.
+    const params = { file: filePath, job: jobRef, profile: Boolean(profile), citations: Boolean(citations) };
+    callWorker('submit_job', { kind: 'run_audit', params })
+        .then(job => {
+            if (runAsync) return res.status(202).json(job);
+            return waitForJob(job.job_id, 300000).then(done => {
+                if (done.status !== 'done') throw new Error(done.error || `Audit job ${done.status}`);
+                res.json(JSON.parse(fs.readFileSync(done.result.audit_json, 'utf8')));
             });
-        } else {
-            res.status(500).json({ error: 'Could not locate result JSON in script output' });
-        }
-    });
+        })
+        .catch(err => {
+            console.error(`Error: ${err.message}`);
+            res.status(jobErrorStatus(err)).json({ error: 'Audit execution failed', details: err.message });
+        });
 });
 
 // Endpoint for Ollama LLM integration
@@ -176,19 +300,91 @@ app.get('/api/admin/manuals', (req, res) => {
     });
 });
 
-// Endpoint to trigger RAG re-indexing
+// Endpoint to trigger RAG re-indexing (queued; a request made while one is
+// still waiting joins it). Follow progress on /api/jobs/:id/events.
 app.post('/api/admin/reindex', (req, res) => {
     console.log('RAG Re-indexing Triggered');
-    const cmd = `python3 ingest_manuals.py`;
+    callWorker('submit_job', { kind: 'reindex', params: { rebuild: Boolean(req.body && req.body.rebuild) } })
+        .then(job => res.status(202).json(job))
+        .catch(err => {
+            console.error('Re-index Error:', err.message);
+            res.status(jobErrorStatus(err)).json({ error: 'Re-indexing failed', details: err.message });
+        });
+});
 
-    exec(cmd, { cwd: PROJECT_ROOT }, (error, stdout, stderr) => {
-        if (error) {
-            console.error('Re-index Error:', stderr || error.message);
-            return res.status(500).json({ error: 'Re-indexing failed', details: stderr });
+// Job status endpoints: recent jobs, one job (polling), and its events (SSE)
+app.get('/api/jobs', (req, res) => {
+    callWorker('list_jobs', { limit: Number(req.query.limit) || 50 })
+        .then(jobs => res.json(jobs))
+        .catch(err => res.status(500).json({ error: 'Failed to list jobs', details: err.message }));
+});
+
+app.get('/api/jobs/:id', (req, res) => {
+    callWorker('job_status', { job_id: req.params.id })
+        .then(job => res.json(job))
+        .catch(err => res.status(404).json({ error: 'Job not found', details: err.message }));
+});
+
+app.get('/api/jobs/:id/events', (req, res) => {
+    const jobId = req.params.id;
+    let lastSeq = Number(req.get('Last-Event-ID') || req.query.since) || 0;
+    res.set({ 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', Connection: 'keep-alive' });
+    res.flushHeaders();
+
+    const send = event => {
+        if (res.writableEnded) return;
+        if (event.seq !== undefined) {
+            if (event.seq <= lastSeq) return;
+            lastSeq = event.seq;
+            res.write(`id: ${event.seq}\n`);
         }
-        console.log('Re-index Success:', stdout);
-        res.json({ success: true, message: 'Vector database rebuilt successfully', log: stdout });
-    });
+        res.write(`data: ${JSON.stringify(event)}\n\n`);
+        if (event.type === 'status' && JOB_DONE.includes(event.status)) res.end();
+    };
+    // Live events can arrive before the backlog replay; hold them until it is sent,
+    // then flush in seq order so no replayed event is skipped
+    let buffered = [];
+    const unwatch = watchJob(jobId, event => (buffered ? buffered.push(event) : send(event)));
+    req.on('close', unwatch);
+    res.on('finish', unwatch);
+    const flush = () => {
+        const live = buffered;
+        buffered = null;
+        live.sort((a, b) => (a.seq ?? Infinity) - (b.seq ?? Infinity)).forEach(send);
+    };
+
+    callWorker('job_events', { job_id: jobId, since: lastSeq })
+        .then(events => events.forEach(send))
+        .then(() => {
+            flush();
+            return callWorker('job_status', { job_id: jobId });
+        })
+        .then(job => {
+            // Finished before this process saw its events (e.g. after a worker restart)
+            if (!res.writableEnded && JOB_DONE.includes(job.status)) send({ job_id: jobId, type: 'status', status: job.status, error: job.error });
+        })
+        .catch(err => {
+            if (buffered) flush();
+            send({ job_id: jobId, type: 'status', status: 'failed', error: err.message });
+        });
+});
+
+// Cross-run analytics from the incremental rollups, e.g.
+// /api/analytics/recurring_failures?job=PROJ-101 or /api/analytics/room_ach_trend?job=PROJ-101&room=Lab%201
+app.get('/api/analytics/:view', (req, res) => {
+    const params = { view: req.params.view };
+    for (const key of ['job', 'room']) if (req.query[key]) params[key] = req.query[key];
+    for (const key of ['limit', 'min_failed_runs']) if (req.query[key]) params[key] = Number(req.query[key]);
+    callWorker('analytics', params)
+        .then(rows => res.json(rows))
+        .catch(err => res.status(400).json({ error: 'Analytics query failed', details: err.message }));
+});
+
+// Endpoint to inspect the RAG query cache (hit/miss counters)
+app.get('/api/admin/rag-cache-stats', (req, res) => {
+    callWorker('cache_stats', {})
+        .then(stats => res.json(stats))
+        .catch(err => res.status(500).json({ error: 'Failed to read cache stats', details: err.message }));
 });
 
 // Endpoint to query the local RAG Vector Database
@@ -198,24 +394,12 @@ app.post('/api/rag-query', (req, res) => {
 
     console.log(`RAG Query Initiated: "${query}"`);
 
-    // Execute the Python bridge script
-    // Using --break-system-packages context if needed, but here we just run python3 directly
-    const cmd = `python3 query_manuals.py "${query.replace(/"/g, '\\"')}"`;
-
-    exec(cmd, { cwd: PROJECT_ROOT, timeout: 60000 }, (error, stdout, stderr) => {
-        if (error) {
-            console.error('RAG Query Error:', stderr || error.message);
-            return res.status(500).json({ error: 'Failed to query vector database', details: stderr });
-        }
-
-        try {
-            const data = JSON.parse(stdout);
-            res.json(data);
-        } catch (parseErr) {
-            console.error('RAG Parse Error:', stdout);
-            res.status(500).json({ error: 'invalid response from RAG engine' });
-        }
-    });
+    callWorker('rag_query', { query }, 60000)
+        .then(data => res.json(data))
+        .catch(err => {
+            console.error('RAG Query Error:', err.message);
+            res.status(500).json({ error: 'Failed to query vector database', details: err.message });
+        });
 });
 
 // Endpoint for Ollama LLM integration
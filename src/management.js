@@ -37,27 +37,75 @@ async function loadStats() {
     }
 }
 
+function describeProgress(event) {
+    if (event.stage === 'pages_parsed') return `> Parsed ${event.file} (${event.files_done}/${event.files_total} manuals, ${event.done} pages)`;
+    if (event.stage === 'chunks_embedded') return `> Embedded ${event.done}/${event.total} chunks`;
+    return `> ${event.stage}: ${event.done}`;
+}
+
+// Streams a job's events (falls back to polling); resolves with its final status
+function followJob(jobId, onEvent) {
+    return new Promise(resolve => {
+        const finished = job => resolve(job);
+        const poll = async () => {
+            try {
+                const res = await fetch(`${API_BASE}/api/jobs/${jobId}`);
+                const job = await res.json();
+                if (['done', 'failed', 'interrupted'].includes(job.status)) return finished(job);
+            } catch (e) {
+                // Server restarting; keep polling
+            }
+            setTimeout(poll, 2000);
+        };
+        if (!window.EventSource) return poll();
+
+        const source = new EventSource(`${API_BASE}/api/jobs/${jobId}/events`);
+        source.onmessage = message => {
+            const event = JSON.parse(message.data);
+            onEvent(event);
+            if (event.type === 'status' && ['done', 'failed', 'interrupted'].includes(event.status)) {
+                source.close();
+                fetch(`${API_BASE}/api/jobs/${jobId}`).then(res => res.json()).then(finished, () => finished(event));
+            }
+        };
+        source.onerror = () => {
+            source.close();
+            poll();
+        };
+    });
+}
+
 reindexBtn.addEventListener('click', async () => {
-    if (!confirm('Rebuilding the index will delete the current vector database and re-process all manuals. Proceed?')) return;
+    if (!confirm('Re-indexing will embed new or changed manuals and remove deleted ones from the vector database. Proceed?')) return;
 
     reindexBtn.disabled = true;
     reindexBtn.textContent = '⏳ Ingesting & Embedding...';
     indexingStatus.textContent = 'Working';
     indexingStatus.className = 'status-badge working';
     reindexLog.classList.remove('hidden');
-    logContent.textContent = '> Initializing vector engine...\n> Wiping old database...\n';
+    logContent.textContent = '> Queuing re-index job...\n';
 
     try {
         const res = await fetch(`${API_BASE}/api/admin/reindex`, { method: 'POST' });
         const data = await res.json();
+        if (!res.ok) throw new Error(data.details || 'Unknown error');
+
+        logContent.textContent += data.coalesced
+            ? `> Joined the re-index already queued (job ${data.job_id})\n`
+            : `> Job ${data.job_id} queued\n`;
+        const job = await followJob(data.job_id, event => {
+            if (event.type === 'progress') logContent.textContent += describeProgress(event) + '\n';
+            else logContent.textContent += `> Job ${event.status}\n`;
+            reindexLog.scrollTop = reindexLog.scrollHeight;
+        });
 
-        if (res.ok) {
-            logContent.textContent += data.log || '> Re-indexing Complete.';
+        if (job.status === 'done') {
+            logContent.textContent += (job.result && job.result.log) || '> Re-indexing Complete.';
             logContent.textContent += '\n\nSUCCESS: Vector vault is up to date.';
             indexingStatus.textContent = 'Ready';
             indexingStatus.className = 'status-badge';
         } else {
-            logContent.textContent += `\nERROR: ${data.details || 'Unknown error'}`;
+            logContent.textContent += `\nERROR: ${job.error || 'Unknown error'}`;
             indexingStatus.textContent = 'Failed';
             indexingStatus.className = 'status-badge working';
         }
@@ -66,7 +114,7 @@ reindexBtn.addEventListener('click', async () => {
         indexingStatus.textContent = 'Error';
     } finally {
         reindexBtn.disabled = false;
-        reindexBtn.textContent = '🚀 Rebuild Regulatory Index';
+        reindexBtn.textContent = '🚀 Update Regulatory Index';
         reindexLog.scrollTop = reindexLog.scrollHeight;
     }
 });
@@ -0,0 +1,155 @@
+import os
+import csv
+import random
+import argparse
+
+# --- CONFIGURATION ---
+# Weighted mixes loosely based on lab fit-outs: mostly ISO 8 support space and terminal units
+ROOM_CLASSES = [("ISO_7", 30), ("ISO_8", 40), ("BSL_3", 10), ("UNCLASSIFIED", 20)]
+ROOM_TYPES = ["Tissue Culture Lab", "General Prep Area", "Storage Room", "Analytical Lab",
+              "Gowning Room", "Cold Room", "Autoclave Room", "Corridor", "Office"]
+EQUIPMENT_CATEGORIES = [
+    # category, weight, mark prefix, description, service
+    ("Terminal Unit", 40, "VAV", "VAV Box w/ Reheat", "Supply Air"),
+    ("Fan", 20, "EF", "Centrifugal Roof Exhaust", "Lab Exhaust"),
+    ("Pump", 12, "P", "End Suction Pump", "Heating Water"),
+    ("Air Handling Unit", 8, "AHU", "Custom Air Handler", "Supply Air"),
+    ("Condensing Unit", 8, "CU", "Split System Condenser", "Refrigerant"),
+    ("Chiller", 4, "CH", "Air-Cooled Scroll Chiller", "Chilled Water"),
+    ("Boiler", 4, "B", "Condensing Boiler", "Heating Water"),
+    ("Unit Heater", 4, "UH", "Electric Unit Heater", "Space Heating"),
+]
+MANUFACTURERS = ["Trane", "Greenheck", "Bell & Gossett", "Price", "Carrier", "Daikin", "Armstrong"]
+POWER_VALUES = ["460/3/60", "208/3/60", "120/1/60", "277/1/60"]
+# Malformed cells as they show up in exported schedules
+MALFORMED_NUMERIC = ["-", "", "TBD", "n/a"]
+MALFORMED_POWER = ["", "-", "480V", "TBD"]
+EQUIPMENT_FIELDS = ["Mark", "Category", "Description", "Manufacturer", "Model Number", "Service",
+                    "Flow Rate (GPM)", "Static Pressure (in wg)", "Power (V/PH/Hz)", "Location"]
+ROOM_FIELDS = ["name", "class", "area", "height", "supply_airflow_m3h", "temp", "humidity"]
+
+MANUAL_TERMS = ["air changes per hour", "ISO 14644-1", "differential pressure", "HEPA filter",
+                "unidirectional airflow", "grade A", "grade B", "recovery time", "particle count",
+                "relative humidity", "temperature mapping", "BSL-3 containment", "exhaust fan",
+                "static pressure", "commissioning", "alarm set point"]
+
+def _weighted(rng, choices):
+    return rng.choices(choices, weights=[c[1] for c in choices])[0]
+
+def _maybe_malformed(rng, value, rate, malformed=MALFORMED_NUMERIC):
+    return rng.choice(malformed) if rng.random() < rate else value
+
+def make_room_rows(n, malformed_rate=0.02, seed=42):
+    """Room schedule rows (CSV strings); malformed rows are skipped by the loader"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        room_class = _weighted(rng, ROOM_CLASSES)[0]
+        area = rng.uniform(8, 120)
+        height = rng.choice([2.7, 3.0, 3.5])
+        # Airflow roughly sized for the class, so pass/fail is a realistic mix
+        target_ach = {"ISO_7": 40, "ISO_8": 15, "BSL_3": 12}.get(room_class, 6) * rng.uniform(0.6, 1.4)
+        rows.append({
+            "name": f"{rng.choice(ROOM_TYPES)} {i:06d}",
+            "class": room_class,
+            "area": _maybe_malformed(rng, f"{area:.1f}", malformed_rate),
+            "height": str(height),
+            "supply_airflow_m3h": _maybe_malformed(rng, f"{area * height * target_ach:.0f}", malformed_rate),
+            "temp": str(rng.choice([20, 21, 22, 23])) if rng.random() < 0.8 else f"{rng.uniform(17, 28):.1f}",
+            "humidity": str(rng.choice([40, 45, 50])) if rng.random() < 0.8 else f"{rng.uniform(25, 70):.0f}",
+        })
+    return rows
+
+def make_equipment_rows(n, malformed_rate=0.05, seed=42):
+    """Equipment schedule rows with '-' placeholders and malformed numeric/power cells"""
+    rng = random.Random(seed)
+    counters = {}
+    rows = []
+    for _ in range(n):
+        category, _, prefix, description, service = _weighted(rng, EQUIPMENT_CATEGORIES)
+        counters[prefix] = counters.get(prefix, 0) + 1
+        flow = f"{rng.uniform(20, 900):.0f}" if category in ("Pump", "Chiller", "Boiler", "Fan", "Terminal Unit") else "-"
+        pressure = f"{rng.choice([0.25, 0.5, 0.75, 1.0, 1.5, 2.0]):.2f}" if category in ("Fan", "Terminal Unit", "Air Handling Unit") else "-"
+        rows.append({
+            "Mark": f"{prefix}-{counters[prefix] // 100 + 1}-{counters[prefix] % 100:02d}",
+            "Category": category,
+            "Description": description,
+            "Manufacturer": rng.choice(MANUFACTURERS),
+            "Model Number": f"{prefix}{rng.randint(100, 999)}",
+            "Service": service,
+            "Flow Rate (GPM)": _maybe_malformed(rng, flow, malformed_rate),
+            "Static Pressure (in wg)": _maybe_malformed(rng, pressure, malformed_rate),
+            "Power (V/PH/Hz)": _maybe_malformed(rng, rng.choice(POWER_VALUES), malformed_rate, MALFORMED_POWER),
+            "Location": f"Level {rng.randint(1, 6)} {rng.choice(['Plenum', 'Mechanical Room', 'Roof'])}",
+        })
+    return rows
+
+def _write_csv(path, fields, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def write_room_schedule(path, n, malformed_rate=0.02, seed=42):
+    return _write_csv(path, ROOM_FIELDS, make_room_rows(n, malformed_rate, seed))
+
+def write_equipment_schedule(path, n, malformed_rate=0.05, seed=42):
+    return _write_csv(path, EQUIPMENT_FIELDS, make_equipment_rows(n, malformed_rate, seed))
+
+def make_manual_pages(pages, seed=42, lines_per_page=40):
+    """Regulation-style text pages built from MANUAL_TERMS"""
+    rng = random.Random(seed)
+    text_pages = []
+    for page in range(pages):
+        lines = [f"Section {page + 1}.{line + 1}: The {rng.choice(MANUAL_TERMS)} shall be verified against "
+                 f"the {rng.choice(MANUAL_TERMS)} at {rng.randint(5, 60)} intervals."
+                 for line in range(lines_per_page)]
+        text_pages.append(lines)
+    return text_pages
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_manual_pdf(path, pages, seed=42):
+    """Writes a minimal text-only PDF (Helvetica, one content stream per page)"""
+    text_pages = make_manual_pages(pages, seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in text_pages:
+        body = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, 'wb') as f:
+        f.write(out)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic room/equipment schedules and manuals")
+    parser.add_argument("--rooms", type=int, default=10_000)
+    parser.add_argument("--equipment", type=int, default=10_000)
+    parser.add_argument("--malformed", type=float, default=0.05, help="Fraction of malformed cells")
+    parser.add_argument("--manuals", type=int, default=0, help="Synthetic manual PDFs to write")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per manual")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="synthetic")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    print(write_room_schedule(os.path.join(args.out, "RoomSchedule.csv"), args.rooms, args.malformed / 2, args.seed))
+    print(write_equipment_schedule(os.path.join(args.out, "MEPComponents.csv"), args.equipment, args.malformed, args.seed))
+    for index in range(args.manuals):
+        print(write_manual_pdf(os.path.join(args.out, f"Synthetic_Manual_{index + 1:02d}.pdf"), args.pages, args.seed + index))
@@ -0,0 +1,141 @@
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+import http.server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import download_manuals
+from download_manuals import ChecksumError, fetch, make_session
+
+BODY = bytes(range(256)) * 1024  # 256 KB: several CHUNK_SIZE reads
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for a manuals host. Class attributes script its behaviour per test."""
+    ignore_range = False  # Answer Range requests with 200 and the whole body
+    drop_after = None     # Close the connection after this many body bytes (once)
+    fail_first = 0        # Answer this many requests with 503 first
+    status = None         # Answer every request with this status and no body
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests.append(self.headers.get("Range"))
+        if cls.fail_first or cls.status:
+            if cls.fail_first:
+                cls.fail_first -= 1
+            self.send_response(cls.status or 503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and not cls.ignore_range:
+            start = int(range_header[len("bytes="):].split("-")[0])
+            if start >= len(BODY):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(BODY)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        else:
+            self.send_response(200)
+        body = BODY[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if cls.drop_after is not None:
+            self.wfile.write(body[:cls.drop_after])
+            cls.drop_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+class FetchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/manual.pdf"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandIn.ignore_range = False
+        StandIn.drop_after = None
+        StandIn.fail_first = 0
+        StandIn.status = None
+        StandIn.requests = []
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "manual.pdf")
+        self.session = make_session()
+        self.sha256 = hashlib.sha256(BODY).hexdigest()
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_resumes_after_dropped_connection(self):
+        StandIn.drop_after = 100_000
+        self.assertEqual(fetch(self.session, self.url, self.path, self.sha256), self.sha256)
+        self.assertEqual(self.read(), BODY)
+        self.assertEqual(StandIn.requests[0], None)
+        self.assertTrue(StandIn.requests[1].startswith("bytes="))
+        self.assertGreater(int(StandIn.requests[1][len("bytes="):-1]), 0)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+
+    def test_checksum_mismatch_discards_partial(self):
+        with self.assertRaises(ChecksumError):
+            fetch(self.session, self.url, self.path, "0" * 64)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + ".part"))
+
+    def test_full_response_to_range_request_restarts_file(self):
+        StandIn.ignore_range = True
+        with open(self.path + ".part", 'wb') as f:
+            f.write(b"stale bytes")
+        fetch(self.session, self.url, self.path)
+        self.assertEqual(self.read(), BODY)
+
+    def test_complete_partial_accepted_on_416(self):
+        with open(self.path + ".part", 'wb') as f:
+            f.write(BODY)
+        fetch(self.session, self.url, self.path)
+        self.assertEqual(self.read(), BODY)
+        self.assertEqual(len(StandIn.requests), 1)
+
+    def test_oversized_partial_restarts_on_416(self):
+        with open(self.path + ".part", 'wb') as f:
+            f.write(BODY + b"trailing garbage")
+        fetch(self.session, self.url, self.path)
+        self.assertEqual(self.read(), BODY)
+
+    def test_server_error_is_retried(self):
+        StandIn.fail_first = 1
+        fetch(self.session, self.url, self.path, self.sha256)
+        self.assertEqual(self.read(), BODY)
+
+    def test_client_error_is_not_retried(self):
+        StandIn.status = 404
+        with self.assertRaises(download_manuals.requests.HTTPError):
+            fetch(self.session, self.url, self.path)
+        self.assertEqual(len(StandIn.requests), 1)
+
+if __name__ == "__main__":
+    unittest.main()
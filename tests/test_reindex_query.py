@@ -0,0 +1,73 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import textwrap
+import unittest
+import subprocess
+import importlib.util
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import audit_worker
+import query_manuals
+from embedding_cache import HashEmbeddings
+from query_cache import QueryCache
+
+# Stands in for ingest_manuals.py: a separate process that deletes one manual's chunk and adds another's
+REINDEX = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, sys.argv[1])
+    from langchain_community.vectorstores import Chroma
+    from langchain_core.documents import Document
+    from embedding_cache import HashEmbeddings
+    from query_cache import write_index_generation
+    store = Chroma(persist_directory=sys.argv[2], embedding_function=HashEmbeddings())
+    store.add_documents([Document(page_content="bravo supply fan", metadata={"source_manual": "b.pdf", "page": 1})],
+                        ids=["b"])
+    store.delete(ids=["a"])
+    write_index_generation(sys.argv[2])
+""")
+
+@unittest.skipUnless(importlib.util.find_spec("langchain_community") and importlib.util.find_spec("chromadb"),
+                     "RAG stack not installed")
+class ReindexQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = (query_manuals.DB_PATH, audit_worker.AUDIT_DIR, audit_worker.JOB_DB_PATH)
+        query_manuals.DB_PATH = os.path.join(self.dir, "db")
+        audit_worker.AUDIT_DIR = os.path.join(self.dir, "audit runs")
+        audit_worker.JOB_DB_PATH = os.path.join(self.dir, "jobs.sqlite3")
+        query_manuals.reset_vectorstore()
+        query_manuals._query_cache = QueryCache(":memory:")
+        self.worker = audit_worker.AuditWorker(io.StringIO())
+
+    def tearDown(self):
+        query_manuals.reset_vectorstore()
+        query_manuals._query_cache = None
+        query_manuals.DB_PATH, audit_worker.AUDIT_DIR, audit_worker.JOB_DB_PATH = self.saved
+        shutil.rmtree(self.dir)
+
+    def test_query_after_reindex_in_child_process(self):
+        from langchain_core.documents import Document
+
+        store = query_manuals.get_vectorstore(HashEmbeddings())
+        store.add_documents([Document(page_content="alpha supply fan", metadata={"source_manual": "a.pdf", "page": 1})],
+                            ids=["a"])
+        before = self.worker.rag_query({"query": "supply fan"})
+        self.assertEqual([item["source"] for item in before["results"]], ["a.pdf"])
+
+        subprocess.run([sys.executable, "-c", REINDEX, PROJECT_DIR, query_manuals.DB_PATH], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.worker.reload_index({})
+        # reload_index drops the embedder too; keep the stub instead of the Ollama default
+        query_manuals.get_embeddings(HashEmbeddings())
+
+        after = self.worker.rag_query({"query": "supply fan"})
+        self.assertNotIn("error", after)
+        self.assertEqual([item["source"] for item in after["results"]], ["b.pdf"])
+
+if __name__ == "__main__":
+    unittest.main()
